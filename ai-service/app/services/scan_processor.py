@@ -178,20 +178,61 @@ class ScanProcessor:
                 header, encoded = image_url.split(',', 1)
                 data = base64.b64decode(encoded)
                 image = Image.open(BytesIO(data))
-            else:
-                # Download from URL
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(image_url)
+                
+                # Convert to numpy array
+                return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            
+            # Stream the body into a single buffer instead of holding
+            # response.content, a BytesIO copy and the decoded image at once
+            async with httpx.AsyncClient() as client:
+                async with client.stream('GET', image_url) as response:
                     response.raise_for_status()
-                    image = Image.open(BytesIO(response.content))
+                    buffer = await self._read_body(response)
             
-            # Convert to numpy array
-            return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            # np.frombuffer is zero-copy; imdecode yields BGR directly
+            image = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError(f"Could not decode image from {image_url}")
+            return image
             
         except Exception as e:
             logger.error(f"Failed to download/process image: {e}")
             raise
     
+    async def _read_body(self, response: httpx.Response) -> bytearray:
+        """Read a streamed response body into a preallocated bytearray."""
+        length = int(response.headers.get('content-length', 0))
+        
+        # Content-Length describes the encoded body, so only trust it for
+        # preallocation when the payload is not transfer-compressed
+        if not length or 'content-encoding' in response.headers:
+            buffer = bytearray()
+            async for chunk in response.aiter_bytes():
+                buffer.extend(chunk)
+            return buffer
+        
+        buffer = bytearray(length)
+        view = memoryview(buffer)
+        offset = 0
+        chunks = response.aiter_bytes()
+        async for chunk in chunks:
+            end = offset + len(chunk)
+            if end > length:
+                # Server sent more than advertised; fall back to growing
+                view.release()
+                del buffer[offset:]
+                buffer.extend(chunk)
+                async for rest in chunks:
+                    buffer.extend(rest)
+                return buffer
+            view[offset:end] = chunk
+            offset = end
+        view.release()
+        
+        if offset < length:
+            del buffer[offset:]
+        return buffer
+    
     async def _is_modification(self, part_match: Dict, vehicle_id: Optional[str]) -> bool:
         """Check if a detected part is a modification."""
         if not vehicle_id:
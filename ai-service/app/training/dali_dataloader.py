@@ -0,0 +1,209 @@
+"""
+NVIDIA DALI data loading for YOLOv8 detection training.
+
+Decodes JPEGs on the GPU with nvJPEG and runs the box-aware crop, HSV and
+flip augmentations as DALI ops, producing batches in the format Ultralytics'
+DetectionTrainer consumes. Mosaic and mixup have no DALI equivalent and are
+not applied.
+"""
+
+import math
+from typing import Any, Dict, List
+
+import numpy as np
+import torch
+
+try:
+    from nvidia.dali import pipeline_def, fn, types
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator
+    DALI_AVAILABLE = True
+except ImportError:
+    DALI_AVAILABLE = False
+
+
+class DetectionSource:
+    """
+    Per-sample DALI external source yielding encoded images with their boxes.
+    
+    Each epoch is a fresh permutation shared by all shards; every shard reads
+    its own slice, padded to whole batches so all ranks run the same steps.
+    """
+    
+    def __init__(self, files: List[str], labels: List[Dict[str, Any]], batch_size: int,
+                 shard_id: int = 0, num_shards: int = 1, seed: int = 0):
+        """
+        Initialize the source.
+        
+        Args:
+            files: Image paths
+            labels: Ultralytics label dicts with normalized xywh ``bboxes`` and ``cls``
+            batch_size: Samples per batch
+            shard_id: Rank of this process when training with DDP
+            num_shards: World size when training with DDP
+            seed: Base seed for the per-epoch shuffle
+        """
+        self.files = files
+        self.seed = seed
+        self.shard_size = math.ceil(len(files) / num_shards)
+        self.shard_start = shard_id * self.shard_size
+        self.epoch_size = math.ceil(self.shard_size / batch_size) * batch_size
+        
+        # DALI crops and flips boxes in normalized ltrb form
+        self.boxes = []
+        self.classes = []
+        for label in labels:
+            xywh = np.asarray(label['bboxes'], dtype=np.float32).reshape(-1, 4)
+            ltrb = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+            self.boxes.append(np.clip(ltrb, 0.0, 1.0))
+            self.classes.append(np.asarray(label['cls'], dtype=np.int32).reshape(-1))
+        
+        self._epoch = None
+        self._order = None
+    
+    def __call__(self, sample_info):
+        if sample_info.idx_in_epoch >= self.epoch_size:
+            raise StopIteration
+        
+        if sample_info.epoch_idx != self._epoch:
+            rng = np.random.default_rng(self.seed + sample_info.epoch_idx)
+            self._order = rng.permutation(len(self.files))
+            self._epoch = sample_info.epoch_idx
+        
+        position = self.shard_start + sample_info.idx_in_epoch % self.shard_size
+        idx = self._order[position % len(self.files)]
+        with open(self.files[idx], 'rb') as f:
+            encoded = np.frombuffer(f.read(), dtype=np.uint8)
+        return encoded, self.boxes[idx], self.classes[idx]
+
+
+def build_detection_pipeline(
+    source: DetectionSource,
+    batch_size: int,
+    num_threads: int,
+    device_id: int,
+    imgsz: int,
+    hyp: Dict[str, float]
+):
+    """
+    Build a DALI pipeline that decodes and augments detection samples on the GPU.
+    
+    Args:
+        source: Sample source for this shard
+        batch_size: Samples per batch
+        num_threads: CPU threads for DALI and the Python source workers
+        device_id: CUDA device index
+        imgsz: Square training image size
+        hyp: Augmentation hyperparameters (``hsv_h``, ``hsv_s``, ``hsv_v``,
+            ``fliplr``, ``scale``) as in the Ultralytics config
+    
+    Returns:
+        Built DALI pipeline
+    """
+    @pipeline_def(batch_size=batch_size, num_threads=num_threads, device_id=device_id,
+                  py_num_workers=num_threads, py_start_method='spawn')
+    def _pipeline():
+        encoded, boxes, classes = fn.external_source(
+            source=source,
+            num_outputs=3,
+            batch=False,
+            parallel=True,
+            dtype=[types.UINT8, types.FLOAT, types.INT32]
+        )
+        
+        # Pick a crop window that keeps the boxes, then decode only that window
+        anchor, shape, boxes, classes = fn.random_bbox_crop(
+            boxes,
+            classes,
+            bbox_layout='xyXY',
+            scaling=[max(1.0 - hyp['scale'], 0.1), 1.0],
+            aspect_ratio=[0.5, 2.0],
+            thresholds=[0.0, 0.1, 0.3, 0.5],
+            allow_no_crop=True,
+            num_attempts=50
+        )
+        images = fn.decoders.image_slice(encoded, anchor, shape, device='mixed', output_type=types.RGB)
+        images = fn.resize(images, resize_x=imgsz, resize_y=imgsz)
+        images = fn.hsv(
+            images,
+            hue=fn.random.uniform(range=(-hyp['hsv_h'] * 360, hyp['hsv_h'] * 360)),
+            saturation=fn.random.uniform(range=(1 - hyp['hsv_s'], 1 + hyp['hsv_s'])),
+            value=fn.random.uniform(range=(1 - hyp['hsv_v'], 1 + hyp['hsv_v']))
+        )
+        
+        flip = fn.random.coin_flip(probability=hyp['fliplr'])
+        boxes = fn.bb_flip(boxes, horizontal=flip, ltrb=True)
+        
+        # Ultralytics expects uint8 CHW images and scales them itself
+        images = fn.crop_mirror_normalize(
+            images,
+            dtype=types.UINT8,
+            output_layout='CHW',
+            mirror=flip,
+            mean=[0.0],
+            std=[1.0]
+        )
+        
+        # Pad the variable box counts to the batch maximum; -1 marks padding
+        boxes = fn.pad(boxes, fill_value=-1.0)
+        classes = fn.pad(classes, fill_value=-1)
+        return images, boxes.gpu(), classes.gpu()
+    
+    pipe = _pipeline()
+    pipe.build()
+    return pipe
+
+
+class DALIDetectionLoader:
+    """
+    Drop-in replacement for the Ultralytics training DataLoader backed by DALI.
+    """
+    
+    def __init__(self, dataset, batch_size: int, num_threads: int, device_id: int,
+                 imgsz: int, hyp: Dict[str, float], shard_id: int = 0,
+                 num_shards: int = 1, seed: int = 0):
+        """
+        Initialize the loader.
+        
+        Args:
+            dataset: Ultralytics YOLODataset providing ``im_files`` and ``labels``
+            batch_size: Samples per batch
+            num_threads: CPU threads for DALI and the Python source workers
+            device_id: CUDA device index
+            imgsz: Square training image size
+            hyp: Augmentation hyperparameters
+            shard_id: Rank of this process when training with DDP
+            num_shards: World size when training with DDP
+            seed: Base seed for the per-epoch shuffle
+        """
+        # The trainer still toggles mosaic on the original dataset
+        self.dataset = dataset
+        self.batch_size = batch_size
+        
+        source = DetectionSource(dataset.im_files, dataset.labels, batch_size,
+                                 shard_id, num_shards, seed)
+        self.num_batches = source.epoch_size // batch_size
+        pipeline = build_detection_pipeline(source, batch_size, num_threads, device_id, imgsz, hyp)
+        self.iterator = DALIGenericIterator([pipeline], ['img', 'bboxes', 'cls'], auto_reset=True)
+    
+    def __len__(self) -> int:
+        return self.num_batches
+    
+    def reset(self):
+        """No-op; the trainer calls this after closing mosaic."""
+    
+    def __iter__(self):
+        for outputs in self.iterator:
+            data = outputs[0]
+            classes = data['cls']
+            valid = classes >= 0
+            
+            # Flatten to Ultralytics' (batch_idx, cls, normalized xywh) targets
+            ltrb = data['bboxes'][valid]
+            xywh = torch.cat([(ltrb[:, :2] + ltrb[:, 2:]) / 2, ltrb[:, 2:] - ltrb[:, :2]], dim=1)
+            yield {
+                'img': data['img'],
+                'cls': classes[valid].float().unsqueeze(1),
+                'bboxes': xywh,
+                'batch_idx': valid.nonzero()[:, 0].float(),
+                'im_file': [''] * len(data['img'])
+            }
@@ -3,11 +3,16 @@ ResNet50 training script for automotive part classification.
 """
 
 import os
+import copy
+import contextlib
 import argparse
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader, random_split
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel as DDP
+from torch.utils.data import Dataset, DataLoader, get_worker_info
+from torch.utils.data.distributed import DistributedSampler
 from torchvision import transforms, models
 import numpy as np
 from PIL import Image
@@ -15,17 +20,31 @@ from typing import Dict, List, Tuple, Optional, Any
 import logging
 from pathlib import Path
 import json
+import pickle
 import yaml
 import matplotlib.pyplot as plt
-from sklearn.metrics import confusion_matrix, classification_report
+from sklearn.metrics import classification_report
 import seaborn as sns
 from tqdm import tqdm
 import wandb
 from datetime import datetime
 
+try:
+    from nvidia.dali import pipeline_def, fn, types
+    from nvidia.dali.plugin.pytorch import DALIClassificationIterator, LastBatchPolicy
+    DALI_AVAILABLE = True
+except ImportError:
+    DALI_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Training photos can be large; the decompression-bomb guard only adds overhead here
+Image.MAX_IMAGE_PIXELS = None
+
+# Side length of the square uint8 images stored in the decoded cache
+CACHE_IMAGE_SIZE = 256
+
 
 class AutomotivePartsDataset(Dataset):
     """
@@ -36,7 +55,8 @@ class AutomotivePartsDataset(Dataset):
         self,
         data_dir: str,
         transform: Optional[transforms.Compose] = None,
-        mode: str = 'train'
+        mode: str = 'train',
+        cache_dir: Optional[str] = None
     ):
         """
         Initialize dataset.
@@ -45,52 +65,318 @@ class AutomotivePartsDataset(Dataset):
             data_dir: Root directory of dataset
             transform: Image transformations
             mode: Dataset mode ('train', 'val', 'test')
+            cache_dir: Directory for the decoded image cache. When set, images
+                are served as uint8 CHW tensors from a memory-mapped array
+                instead of being decoded from JPEG on every access.
         """
         self.data_dir = Path(data_dir)
         self.transform = transform
         self.mode = mode
+        self.cache_dir = Path(cache_dir) if cache_dir else None
         
-        # Load dataset metadata
-        self.samples = []
+        # Load dataset metadata as parallel arrays; a list of per-sample dicts
+        # costs a hash table per image and is copied into every worker
+        self.paths: List[str] = []
+        self.class_idx = np.empty(0, dtype=np.int32)
         self.class_to_idx = {}
         self.idx_to_class = {}
         
+        # Opened lazily so each DataLoader worker maps the cache itself
+        self._cached_images = None
+        
         self._load_dataset()
+        
+        if self.cache_dir:
+            self._build_cache()
+        
+        # Positions into the full listing (and the cache) this dataset serves
+        self.indices = np.arange(len(self.paths))
+    
+    def subset(
+        self,
+        indices: np.ndarray,
+        transform: Optional[transforms.Compose] = None
+    ) -> 'AutomotivePartsDataset':
+        """
+        Create a dataset restricted to a split with its own transform.
+        
+        The sample listing and decoded cache are shared with this dataset,
+        so splitting does not rescan the directory tree.
+        
+        Args:
+            indices: Positions within this dataset to keep
+            transform: Image transformations for the split
+        """
+        dataset = copy.copy(self)
+        dataset.indices = self.indices[np.asarray(indices)]
+        dataset.transform = transform
+        return dataset
     
     def _load_dataset(self):
         """Load dataset from directory structure."""
         # Assuming directory structure: data_dir/class_name/image.jpg
-        class_dirs = sorted([d for d in self.data_dir.iterdir() if d.is_dir()])
+        # Hidden entries hold our own caches, never classes
+        with os.scandir(self.data_dir) as it:
+            class_dirs = sorted(
+                (entry for entry in it if entry.is_dir() and not entry.name.startswith('.')),
+                key=lambda entry: entry.name
+            )
+        
+        # A class directory's mtime changes whenever files are added or removed
+        signature = [(entry.name, entry.stat().st_mtime_ns) for entry in class_dirs]
+        cache_path = self.data_dir / '.samples_cache.pkl'
+        
+        if cache_path.exists():
+            try:
+                with open(cache_path, 'rb') as f:
+                    cached = pickle.load(f)
+                if cached['signature'] == signature:
+                    self.paths = cached['paths']
+                    self.class_idx = cached['class_idx']
+                    self.class_to_idx = cached['class_to_idx']
+                    self.idx_to_class = cached['idx_to_class']
+                    logger.info(f"Loaded {len(self.paths)} samples from {len(self.class_to_idx)} classes (cached)")
+                    return
+            except (OSError, pickle.UnpicklingError, KeyError, EOFError) as e:
+                logger.warning(f"Ignoring unreadable sample cache {cache_path}: {e}")
         
+        class_idx = []
         for idx, class_dir in enumerate(class_dirs):
             class_name = class_dir.name
             self.class_to_idx[class_name] = idx
             self.idx_to_class[idx] = class_name
             
-            # Get all images in class directory
-            for img_path in class_dir.glob('*.jpg'):
-                self.samples.append({
-                    'path': str(img_path),
-                    'class_idx': idx,
-                    'class_name': class_name
-                })
+            # Get all images in class directory, DirEntry carries the stat result
+            with os.scandir(class_dir.path) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith('.jpg'):
+                        self.paths.append(entry.path)
+                        class_idx.append(idx)
+        
+        self.class_idx = np.asarray(class_idx, dtype=np.int32)
+        
+        # Write atomically so concurrent DDP ranks never read a partial file
+        tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({
+                    'signature': signature,
+                    'paths': self.paths,
+                    'class_idx': self.class_idx,
+                    'class_to_idx': self.class_to_idx,
+                    'idx_to_class': self.idx_to_class
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write sample cache {cache_path}: {e}")
+        
+        logger.info(f"Loaded {len(self.paths)} samples from {len(self.class_to_idx)} classes")
+    
+    def _build_cache(self):
+        """Decode every image once into a memory-mapped uint8 array."""
+        images_path = self.cache_dir / 'images.npy'
+        labels_path = self.cache_dir / 'labels.npy'
+        manifest_path = self.cache_dir / 'manifest.pkl'
+        
+        # Edited or replaced images and a new cache size invalidate the pixels
+        manifest = {
+            'image_size': CACHE_IMAGE_SIZE,
+            'files': [(path, stat.st_mtime_ns, stat.st_size)
+                      for path, stat in ((path, os.stat(path)) for path in self.paths)]
+        }
+        
+        if images_path.exists() and labels_path.exists() and manifest_path.exists():
+            try:
+                with open(manifest_path, 'rb') as f:
+                    cached_manifest = pickle.load(f)
+                labels = np.load(labels_path, mmap_mode='r')
+                if cached_manifest == manifest and np.array_equal(labels, self.class_idx):
+                    return
+            except (OSError, ValueError, pickle.UnpicklingError, EOFError) as e:
+                logger.warning(f"Ignoring unreadable image cache in {self.cache_dir}: {e}")
         
-        logger.info(f"Loaded {len(self.samples)} samples from {len(self.class_to_idx)} classes")
+        logger.info(f"Building decoded image cache in {self.cache_dir}")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path.unlink(missing_ok=True)
+        
+        images = np.lib.format.open_memmap(
+            images_path,
+            mode='w+',
+            dtype=np.uint8,
+            shape=(len(self.paths), 3, CACHE_IMAGE_SIZE, CACHE_IMAGE_SIZE)
+        )
+        for idx, path in enumerate(tqdm(self.paths, desc='Caching images')):
+            image = Image.open(path).convert('RGB')
+            image = image.resize((CACHE_IMAGE_SIZE, CACHE_IMAGE_SIZE), Image.BILINEAR)
+            images[idx] = np.asarray(image).transpose(2, 0, 1)
+        images.flush()
+        del images
+        
+        np.save(labels_path, self.class_idx)
+        
+        # Written last, so an interrupted build is never taken as valid
+        tmp_path = manifest_path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, manifest_path)
     
     def __len__(self) -> int:
-        return len(self.samples)
+        return len(self.indices)
     
     def __getitem__(self, idx: int) -> Tuple[torch.Tensor, int]:
-        sample = self.samples[idx]
+        idx = self.indices[idx]
         
-        # Load image
-        image = Image.open(sample['path']).convert('RGB')
+        if self.cache_dir:
+            if self._cached_images is None:
+                self._cached_images = np.load(self.cache_dir / 'images.npy', mmap_mode='r')
+            image = torch.from_numpy(self._cached_images[idx].copy())
+        else:
+            # Load image
+            image = Image.open(self.paths[idx]).convert('RGB')
         
         # Apply transforms
         if self.transform:
             image = self.transform(image)
         
-        return image, sample['class_idx']
+        return image, int(self.class_idx[idx])
+
+
+def fast_collate(batch: List[Tuple[torch.Tensor, int]]) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Stack ``(image, label)`` samples straight into a preallocated batch tensor.
+    
+    Skips the recursive type dispatch of ``default_collate``. Inside a worker
+    the batch is written directly into shared memory so it is not copied
+    again on its way to the main process; without workers it is allocated
+    pinned so the non-blocking device copy needs no staging buffer.
+    """
+    images = [image for image, _ in batch]
+    labels = torch.tensor([label for _, label in batch], dtype=torch.long)
+    
+    elem = images[0]
+    if get_worker_info() is not None:
+        storage = elem._typed_storage()._new_shared(len(images) * elem.numel(), device=elem.device)
+        out = elem.new(storage).resize_(len(images), *elem.shape)
+    else:
+        out = torch.empty(
+            (len(images), *elem.shape),
+            dtype=elem.dtype,
+            pin_memory=torch.cuda.is_available()
+        )
+    
+    return torch.stack(images, out=out), labels
+
+
+def build_dali_pipeline(
+    batch_size: int,
+    num_threads: int,
+    device_id: int,
+    files: List[str],
+    labels: List[int],
+    is_training: bool,
+    augmentation: Dict[str, Any],
+    shard_id: int = 0,
+    num_shards: int = 1
+):
+    """
+    Build a DALI pipeline that decodes and augments images on the GPU.
+    
+    JPEGs are decoded with nvJPEG (``device='mixed'``) and every augmentation
+    plus the mean/std normalization runs as a GPU op, so batches arrive as
+    CUDA tensors without PIL decoding or CPU->GPU staging.
+    
+    Args:
+        batch_size: Samples per batch
+        num_threads: CPU threads used by the reader
+        device_id: CUDA device index
+        files: Image paths for this split
+        labels: Class index for each path
+        is_training: Apply random augmentation and shuffle when True
+        augmentation: The ``augmentation`` section of the trainer config
+        shard_id: Rank of this process when training with DDP
+        num_shards: World size when training with DDP
+    
+    Returns:
+        Built DALI pipeline
+    """
+    mean = [m * 255 for m in augmentation['normalize_mean']]
+    std = [s * 255 for s in augmentation['normalize_std']]
+    crop_size = augmentation['random_resized_crop']
+    
+    @pipeline_def(batch_size=batch_size, num_threads=num_threads, device_id=device_id)
+    def _pipeline():
+        jpegs, targets = fn.readers.file(
+            files=files,
+            labels=labels,
+            random_shuffle=is_training,
+            shard_id=shard_id,
+            num_shards=num_shards,
+            name='Reader'
+        )
+        images = fn.decoders.image(jpegs, device='mixed', output_type=types.RGB)
+        
+        if is_training:
+            jitter = augmentation['color_jitter']
+            rotation = augmentation['random_rotation']
+            
+            images = fn.random_resized_crop(images, size=crop_size)
+            images = fn.rotate(
+                images,
+                angle=fn.random.uniform(range=(-rotation, rotation)),
+                keep_size=True,
+                fill_value=0
+            )
+            images = fn.color_twist(
+                images,
+                brightness=fn.random.uniform(range=(1 - jitter, 1 + jitter)),
+                contrast=fn.random.uniform(range=(1 - jitter, 1 + jitter)),
+                saturation=fn.random.uniform(range=(1 - jitter, 1 + jitter)),
+                hue=fn.random.uniform(range=(-jitter * 360, jitter * 360))
+            )
+            mirror = fn.random.coin_flip(
+                probability=augmentation['random_horizontal_flip']
+            )
+        else:
+            images = fn.resize(images, resize_shorter=256)
+            mirror = 0
+        
+        images = fn.crop_mirror_normalize(
+            images,
+            dtype=types.FLOAT,
+            output_layout='CHW',
+            crop=(crop_size, crop_size),
+            mean=mean,
+            std=std,
+            mirror=mirror
+        )
+        return images, targets.gpu()
+    
+    pipe = _pipeline()
+    pipe.build()
+    return pipe
+
+
+class DALILoader:
+    """
+    Adapts a DALI iterator to the ``(inputs, targets)`` batches used by the trainer.
+    """
+    
+    def __init__(self, pipeline, is_training: bool):
+        self.iterator = DALIClassificationIterator(
+            [pipeline],
+            reader_name='Reader',
+            auto_reset=True,
+            last_batch_policy=(
+                LastBatchPolicy.DROP if is_training else LastBatchPolicy.PARTIAL
+            )
+        )
+    
+    def __len__(self) -> int:
+        return len(self.iterator)
+    
+    def __iter__(self):
+        for batch in self.iterator:
+            yield batch[0]['data'], batch[0]['label'].squeeze(-1).long()
 
 
 class ResNetTrainer:
@@ -106,8 +392,39 @@ class ResNetTrainer:
             config_path: Path to training configuration
         """
         self.config = self._load_config(config_path)
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.distributed = dist.is_available() and dist.is_initialized()
+        self.rank = dist.get_rank() if self.distributed else 0
+        self.world_size = dist.get_world_size() if self.distributed else 1
+        self.is_main_process = self.rank == 0
+        
+        if self.distributed:
+            self.local_rank = int(os.environ['LOCAL_RANK'])
+            self.device = torch.device(f'cuda:{self.local_rank}')
+        else:
+            self.local_rank = 0
+            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        
+        # Only rank 0 reports progress when running under torchrun
+        if not self.is_main_process:
+            logger.setLevel(logging.WARNING)
+        
+        # Mixed precision only pays off on CUDA Tensor Cores
+        self.use_amp = self.config['amp'] and self.device.type == 'cuda'
+        
+        # Inputs are a fixed 224x224, let cuDNN pick the fastest kernels once
+        torch.backends.cudnn.benchmark = True
+        
+        # Set when loaders yield raw uint8 images that still need normalizing
+        self.normalize_on_device = False
+        mean = torch.tensor(self.config['augmentation']['normalize_mean'], device=self.device)
+        std = torch.tensor(self.config['augmentation']['normalize_std'], device=self.device)
+        self._norm_scale = (1.0 / (255.0 * std)).view(1, 3, 1, 1)
+        self._norm_shift = (mean / std).view(1, 3, 1, 1)
+        
         self.model = None
+        self.criterion = nn.CrossEntropyLoss()
+        self.train_sampler = None
+        self.class_names: List[str] = []
         self.best_accuracy = 0
         
     def _load_config(self, config_path: Optional[str]) -> Dict[str, Any]:
@@ -116,6 +433,7 @@ class ResNetTrainer:
             'data_dir': 'data/automotive_parts',
             'num_classes': 30,
             'batch_size': 32,
+            'accum_steps': 1,
             'num_epochs': 50,
             'learning_rate': 0.001,
             'weight_decay': 0.0001,
@@ -137,6 +455,11 @@ class ResNetTrainer:
             'use_wandb': False,
             'wandb_project': 'automotive-parts-classification',
             'early_stopping_patience': 10,
+            'amp': True,
+            'compile': True,
+            'use_dali': True,
+            'decode_cache': True,
+            'cache_dir': None,
             'augmentation': {
                 'random_rotation': 15,
                 'random_horizontal_flip': 0.5,
@@ -156,89 +479,171 @@ class ResNetTrainer:
     
     def _setup_data_loaders(self) -> Tuple[DataLoader, DataLoader, DataLoader]:
         """Setup data loaders for training."""
-        # Define transforms
-        train_transform = transforms.Compose([
-            transforms.RandomResizedCrop(
-                self.config['augmentation']['random_resized_crop']
-            ),
-            transforms.RandomHorizontalFlip(
-                p=self.config['augmentation']['random_horizontal_flip']
-            ),
-            transforms.RandomRotation(
-                self.config['augmentation']['random_rotation']
-            ),
-            transforms.ColorJitter(
-                brightness=self.config['augmentation']['color_jitter'],
-                contrast=self.config['augmentation']['color_jitter'],
-                saturation=self.config['augmentation']['color_jitter'],
-                hue=self.config['augmentation']['color_jitter']
-            ),
-            transforms.ToTensor(),
-            transforms.Normalize(
-                mean=self.config['augmentation']['normalize_mean'],
-                std=self.config['augmentation']['normalize_std']
-            )
-        ])
-        
-        val_transform = transforms.Compose([
-            transforms.Resize(256),
-            transforms.CenterCrop(224),
-            transforms.ToTensor(),
-            transforms.Normalize(
-                mean=self.config['augmentation']['normalize_mean'],
-                std=self.config['augmentation']['normalize_std']
-            )
-        ])
+        if self.config['use_dali']:
+            if DALI_AVAILABLE and self.device.type == 'cuda':
+                return self._setup_dali_loaders()
+            logger.warning("DALI unavailable, falling back to torchvision data pipeline")
         
-        # Load full dataset
-        full_dataset = AutomotivePartsDataset(
-            self.config['data_dir'],
-            transform=train_transform
-        )
+        aug = self.config['augmentation']
+        
+        if self.config['decode_cache']:
+            # Cached images are uint8 tensors; normalization happens on the device
+            train_transform = transforms.Compose([
+                transforms.RandomResizedCrop(aug['random_resized_crop'], antialias=True),
+                transforms.RandomHorizontalFlip(p=aug['random_horizontal_flip']),
+                transforms.RandomRotation(aug['random_rotation']),
+                transforms.ColorJitter(
+                    brightness=aug['color_jitter'],
+                    contrast=aug['color_jitter'],
+                    saturation=aug['color_jitter'],
+                    hue=aug['color_jitter']
+                )
+            ])
+            val_transform = transforms.CenterCrop(224)
+            cache_dir = self.config['cache_dir'] or Path(self.config['data_dir']) / '.decoded_cache'
+            self.normalize_on_device = True
+        else:
+            train_transform = transforms.Compose([
+                transforms.RandomResizedCrop(aug['random_resized_crop']),
+                transforms.RandomHorizontalFlip(p=aug['random_horizontal_flip']),
+                transforms.RandomRotation(aug['random_rotation']),
+                transforms.ColorJitter(
+                    brightness=aug['color_jitter'],
+                    contrast=aug['color_jitter'],
+                    saturation=aug['color_jitter'],
+                    hue=aug['color_jitter']
+                ),
+                transforms.ToTensor(),
+                transforms.Normalize(
+                    mean=aug['normalize_mean'],
+                    std=aug['normalize_std']
+                )
+            ])
+            val_transform = transforms.Compose([
+                transforms.Resize(256),
+                transforms.CenterCrop(224),
+                transforms.ToTensor(),
+                transforms.Normalize(
+                    mean=aug['normalize_mean'],
+                    std=aug['normalize_std']
+                )
+            ])
+            cache_dir = None
+        
+        # Let rank 0 build the decoded cache while the other ranks wait for it
+        if self.distributed and not self.is_main_process:
+            dist.barrier()
+        full_dataset = AutomotivePartsDataset(self.config['data_dir'], cache_dir=cache_dir)
+        if self.distributed and self.is_main_process:
+            dist.barrier()
+        self.class_names = [full_dataset.idx_to_class[i] for i in range(len(full_dataset.idx_to_class))]
         
-        # Split dataset
-        total_size = len(full_dataset)
+        # Each split gets its own dataset so transforms never leak across splits
+        train_idx, val_idx, test_idx = self._split_indices(len(full_dataset))
+        train_dataset = full_dataset.subset(train_idx, train_transform)
+        val_dataset = full_dataset.subset(val_idx, val_transform)
+        test_dataset = full_dataset.subset(test_idx, val_transform)
+        
+        return self._build_loaders(train_dataset, val_dataset, test_dataset)
+    
+    def _split_indices(self, total_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Deterministically split sample indices into train/val/test."""
         train_size = int(self.config['train_split'] * total_size)
         val_size = int(self.config['val_split'] * total_size)
-        test_size = total_size - train_size - val_size
         
-        train_dataset, val_dataset, test_dataset = random_split(
-            full_dataset,
-            [train_size, val_size, test_size],
-            generator=torch.Generator().manual_seed(42)
+        rng = np.random.default_rng(42)
+        indices = rng.permutation(total_size)
+        
+        return (
+            indices[:train_size],
+            indices[train_size:train_size + val_size],
+            indices[train_size + val_size:]
         )
+    
+    def _build_loaders(
+        self,
+        train_dataset: Dataset,
+        val_dataset: Dataset,
+        test_dataset: Dataset
+    ) -> Tuple[DataLoader, DataLoader, DataLoader]:
+        """Wrap the dataset splits in (optionally distributed) data loaders."""
+        # Shard each split across processes when training with DDP
+        val_sampler = test_sampler = None
+        if self.distributed:
+            self.train_sampler = DistributedSampler(train_dataset, shuffle=True)
+            val_sampler = DistributedSampler(val_dataset, shuffle=False)
+            test_sampler = DistributedSampler(test_dataset, shuffle=False)
+        
+        loader_kwargs = {
+            # The configured batch size is global, split it across processes
+            'batch_size': self.config['batch_size'] // self.world_size,
+            'num_workers': self.config['num_workers'],
+            'pin_memory': self.config['pin_memory'],
+            'collate_fn': fast_collate
+        }
         
-        # Update transforms for validation and test
-        val_dataset.dataset.transform = val_transform
-        test_dataset.dataset.transform = val_transform
+        # Keep workers alive across epochs instead of re-forking them
+        if self.config['num_workers'] > 0:
+            loader_kwargs['persistent_workers'] = True
+            loader_kwargs['prefetch_factor'] = 4
         
         # Create data loaders
         train_loader = DataLoader(
             train_dataset,
-            batch_size=self.config['batch_size'],
-            shuffle=True,
-            num_workers=self.config['num_workers'],
-            pin_memory=self.config['pin_memory']
+            shuffle=self.train_sampler is None,
+            sampler=self.train_sampler,
+            **loader_kwargs
         )
         
         val_loader = DataLoader(
             val_dataset,
-            batch_size=self.config['batch_size'],
             shuffle=False,
-            num_workers=self.config['num_workers'],
-            pin_memory=self.config['pin_memory']
+            sampler=val_sampler,
+            **loader_kwargs
         )
         
         test_loader = DataLoader(
             test_dataset,
-            batch_size=self.config['batch_size'],
             shuffle=False,
-            num_workers=self.config['num_workers'],
-            pin_memory=self.config['pin_memory']
+            sampler=test_sampler,
+            **loader_kwargs
         )
         
         return train_loader, val_loader, test_loader
     
+    def _setup_dali_loaders(self) -> Tuple[DALILoader, DALILoader, DALILoader]:
+        """Setup GPU data loaders backed by DALI pipelines."""
+        full_dataset = AutomotivePartsDataset(self.config['data_dir'])
+        self.class_names = [full_dataset.idx_to_class[i] for i in range(len(full_dataset.idx_to_class))]
+        splits = self._split_indices(len(full_dataset))
+        
+        loaders = []
+        for split, is_training in zip(splits, (True, False, False)):
+            pipeline = build_dali_pipeline(
+                batch_size=self.config['batch_size'] // self.world_size,
+                num_threads=self.config['num_workers'],
+                device_id=self.device.index or 0,
+                files=[full_dataset.paths[i] for i in split],
+                labels=full_dataset.class_idx[split].tolist(),
+                is_training=is_training,
+                augmentation=self.config['augmentation'],
+                shard_id=self.rank,
+                num_shards=self.world_size
+            )
+            loaders.append(DALILoader(pipeline, is_training))
+        
+        train_loader, val_loader, test_loader = loaders
+        return train_loader, val_loader, test_loader
+    
+    def _prepare_inputs(self, inputs: torch.Tensor) -> torch.Tensor:
+        """Move a batch to the device and normalize it if the loader did not."""
+        # Async copy out of pinned memory overlaps with the previous step
+        inputs = inputs.to(self.device, non_blocking=True)
+        if self.normalize_on_device:
+            # (x / 255 - mean) / std folded into a single multiply-subtract
+            inputs = inputs.float().mul_(self._norm_scale).sub_(self._norm_shift)
+        return inputs.to(memory_format=torch.channels_last)
+    
     def _setup_model(self):
         """Setup ResNet50 model."""
         # Load pretrained ResNet50
@@ -256,22 +661,46 @@ class ResNetTrainer:
             for param in self.model.fc.parameters():
                 param.requires_grad = True
         
-        # Move to device
-        self.model.to(self.device)
+        # Move to device, NHWC matches the cuDNN Tensor Core conv kernels
+        self.model.to(self.device, memory_format=torch.channels_last)
+        
+        # Fuse conv+bn+relu chains; Inductor brings nothing on CPU
+        if self.config['compile'] and self.device.type != 'cpu':
+            self.model = torch.compile(self.model, mode='max-autotune', fullgraph=False)
+        
+        if self.distributed:
+            self._wrap_ddp()
         
         logger.info(f"Model setup complete. Using device: {self.device}")
     
+    def _wrap_ddp(self):
+        """Wrap the model in DistributedDataParallel."""
+        module = self.model.module if isinstance(self.model, DDP) else self.model
+        self.model = DDP(
+            module,
+            device_ids=[self.local_rank],
+            find_unused_parameters=False,
+            gradient_as_bucket_view=True
+        )
+    
+    def _unwrapped_model(self) -> nn.Module:
+        """Return the underlying model without the DDP or torch.compile wrappers."""
+        model = self.model.module if isinstance(self.model, DDP) else self.model
+        return getattr(model, '_orig_mod', model)
+    
     def _setup_training(self):
         """Setup optimizer and loss function."""
         # Get parameters to optimize
         params_to_optimize = self.model.parameters()
         
-        # Setup optimizer
+        # Setup optimizer, updating all parameters with multi-tensor (foreach)
+        # kernels instead of one launch per layer
         self.optimizer = optim.SGD(
             params_to_optimize,
             lr=self.config['learning_rate'],
             momentum=self.config['momentum'],
-            weight_decay=self.config['weight_decay']
+            weight_decay=self.config['weight_decay'],
+            foreach=True
         )
         
         # Setup learning rate scheduler
@@ -287,8 +716,8 @@ class ResNetTrainer:
                 T_max=self.config['num_epochs']
             )
         
-        # Setup loss function
-        self.criterion = nn.CrossEntropyLoss()
+        # Loss scaling keeps FP16 gradients from underflowing
+        self.scaler = torch.cuda.amp.GradScaler(enabled=self.use_amp)
         
     def train_epoch(
         self,
@@ -297,63 +726,115 @@ class ResNetTrainer:
     ) -> Tuple[float, float]:
         """Train for one epoch."""
         self.model.train()
-        running_loss = 0.0
-        correct = 0
+        
+        # Accumulate on the device so no step has to wait on a host sync
+        running_loss = torch.zeros((), device=self.device)
+        correct = torch.zeros((), dtype=torch.long, device=self.device)
         total = 0
         
-        progress_bar = tqdm(train_loader, desc=f'Epoch {epoch}')
+        # Gradients of accum_steps batches are summed before each optimizer
+        # step, giving an effective batch of batch_size * accum_steps
+        accum_steps = self.config['accum_steps']
+        num_batches = len(train_loader)
+        
+        # Redraw at most once per log interval and only on rank 0
+        progress_bar = tqdm(
+            train_loader,
+            desc=f'Epoch {epoch}',
+            miniters=self.config['log_interval'],
+            mininterval=1.0,
+            disable=not self.is_main_process
+        )
+        
+        # Zero gradients
+        self.optimizer.zero_grad(set_to_none=True)
         
         for batch_idx, (inputs, targets) in enumerate(progress_bar):
-            inputs, targets = inputs.to(self.device), targets.to(self.device)
+            inputs = self._prepare_inputs(inputs)
+            targets = targets.to(self.device, non_blocking=True)
             
-            # Zero gradients
-            self.optimizer.zero_grad()
+            is_step = (batch_idx + 1) % accum_steps == 0 or batch_idx + 1 == num_batches
             
-            # Forward pass
-            outputs = self.model(inputs)
-            loss = self.criterion(outputs, targets)
+            # Skip the DDP all-reduce on batches that only accumulate
+            if self.distributed and not is_step:
+                sync_context = self.model.no_sync()
+            else:
+                sync_context = contextlib.nullcontext()
+            
+            with sync_context:
+                # Forward pass
+                with torch.autocast(device_type='cuda', dtype=torch.float16, enabled=self.use_amp):
+                    outputs = self.model(inputs)
+                    loss = self.criterion(outputs, targets)
+                
+                # Backward pass
+                self.scaler.scale(loss / accum_steps).backward()
             
-            # Backward pass
-            loss.backward()
-            self.optimizer.step()
+            if is_step:
+                self.scaler.step(self.optimizer)
+                self.scaler.update()
+                self.optimizer.zero_grad(set_to_none=True)
             
             # Statistics
-            running_loss += loss.item()
-            _, predicted = outputs.max(1)
+            running_loss += loss.detach()
+            predicted = outputs.argmax(1)
             total += targets.size(0)
-            correct += predicted.eq(targets).sum().item()
+            correct += predicted.eq(targets).sum()
             
-            # Update progress bar
-            progress_bar.set_postfix({
-                'loss': running_loss / (batch_idx + 1),
-                'acc': 100. * correct / total
-            })
+            # Update progress bar, syncing once per log interval
+            if not progress_bar.disable and batch_idx % self.config['log_interval'] == 0:
+                loss_sum, correct_sum = torch.stack(
+                    (running_loss, correct.to(running_loss.dtype))
+                ).tolist()
+                progress_bar.set_postfix({
+                    'loss': loss_sum / (batch_idx + 1),
+                    'acc': 100. * correct_sum / total
+                })
         
-        epoch_loss = running_loss / len(train_loader)
-        epoch_acc = 100. * correct / total
+        epoch_loss = running_loss.item() / len(train_loader)
+        epoch_acc = 100. * correct.item() / total
         
         return epoch_loss, epoch_acc
     
     def validate(self, val_loader: DataLoader) -> Tuple[float, float]:
         """Validate the model."""
         self.model.eval()
-        running_loss = 0.0
-        correct = 0
+        running_loss = torch.zeros((), device=self.device)
+        correct = torch.zeros((), dtype=torch.long, device=self.device)
         total = 0
         
-        with torch.no_grad():
-            for inputs, targets in tqdm(val_loader, desc='Validation'):
-                inputs, targets = inputs.to(self.device), targets.to(self.device)
+        with torch.inference_mode(), torch.autocast(
+            device_type='cuda', dtype=torch.float16, enabled=self.use_amp
+        ):
+            for inputs, targets in tqdm(val_loader, desc='Validation', disable=not self.is_main_process):
+                inputs = self._prepare_inputs(inputs)
+                targets = targets.to(self.device, non_blocking=True)
                 
                 outputs = self.model(inputs)
                 loss = self.criterion(outputs, targets)
                 
-                running_loss += loss.item()
-                _, predicted = outputs.max(1)
+                running_loss += loss
+                predicted = outputs.argmax(1)
                 total += targets.size(0)
-                correct += predicted.eq(targets).sum().item()
+                correct += predicted.eq(targets).sum()
         
-        val_loss = running_loss / len(val_loader)
+        num_batches = len(val_loader)
+        stats = torch.stack((running_loss.double(), correct.double()))
+        
+        # Aggregate over all processes so every rank sees the same metrics
+        if self.distributed:
+            counts = torch.tensor(
+                [num_batches, total],
+                dtype=torch.float64,
+                device=self.device
+            )
+            stats = torch.cat((stats, counts))
+            dist.all_reduce(stats)
+            running_loss, correct, num_batches, total = stats.tolist()
+        else:
+            running_loss, correct = stats.tolist()
+        
+        val_loss = running_loss / num_batches
         val_acc = 100. * correct / total
         
         return val_loss, val_acc
@@ -366,7 +847,7 @@ class ResNetTrainer:
         self._setup_training()
         
         # Initialize wandb if enabled
-        if self.config['use_wandb']:
+        if self.config['use_wandb'] and self.is_main_process:
             wandb.init(
                 project=self.config['wandb_project'],
                 config=self.config
@@ -391,12 +872,20 @@ class ResNetTrainer:
         for epoch in range(1, self.config['num_epochs'] + 1):
             logger.info(f"\nEpoch {epoch}/{self.config['num_epochs']}")
             
+            # Reshuffle the DDP shards differently every epoch
+            if self.train_sampler is not None:
+                self.train_sampler.set_epoch(epoch)
+            
             # Unfreeze backbone after specified epochs
             if (self.config['freeze_backbone'] and 
                 epoch == self.config['freeze_epochs'] + 1):
                 logger.info("Unfreezing backbone layers")
                 for param in self.model.parameters():
                     param.requires_grad = True
+                
+                # DDP only registers reducer hooks for trainable parameters
+                if self.distributed:
+                    self._wrap_ddp()
             
             # Train
             train_loss, train_acc = self.train_epoch(train_loader, epoch)
@@ -417,8 +906,12 @@ class ResNetTrainer:
             history['val_loss'].append(val_loss)
             history['val_acc'].append(val_acc)
             
+            # Persist history every epoch so an interrupted run keeps it
+            if self.is_main_process:
+                self.save_history(save_dir / 'history.json', history)
+            
             # Log to wandb
-            if self.config['use_wandb']:
+            if self.config['use_wandb'] and self.is_main_process:
                 wandb.log({
                     'train_loss': train_loss,
                     'train_acc': train_acc,
@@ -436,7 +929,7 @@ class ResNetTrainer:
                 patience_counter += 1
             
             # Save checkpoint
-            if epoch % self.config['save_interval'] == 0:
+            if self.is_main_process and epoch % self.config['save_interval'] == 0:
                 self.save_checkpoint(
                     save_dir / f'checkpoint_epoch_{epoch}.pth',
                     epoch,
@@ -453,30 +946,30 @@ class ResNetTrainer:
         test_loss, test_acc = self.validate(test_loader)
         logger.info(f"Test Loss: {test_loss:.4f}, Test Acc: {test_acc:.2f}%")
         
-        # Save final model
-        self.save_model(save_dir / 'final_model.pth')
-        
-        # Save training history
-        with open(save_dir / 'history.json', 'w') as f:
-            json.dump(history, f)
-        
-        # Plot training curves
-        self.plot_training_curves(history, save_dir / 'training_curves.png')
+        if self.is_main_process:
+            # Save final model
+            self.save_model(save_dir / 'final_model.pth')
+            
+            # Plot training curves
+            self.plot_training_curves(history, save_dir / 'training_curves.png')
         
         return history
     
     def save_model(self, path: Path):
         """Save model weights."""
-        torch.save(self.model.state_dict(), path)
+        if not self.is_main_process:
+            return
+        torch.save(self._unwrapped_model().state_dict(), path)
         logger.info(f"Model saved to {path}")
     
     def save_checkpoint(self, path: Path, epoch: int, history: Dict):
         """Save training checkpoint."""
         checkpoint = {
             'epoch': epoch,
-            'model_state_dict': self.model.state_dict(),
+            'model_state_dict': self._unwrapped_model().state_dict(),
             'optimizer_state_dict': self.optimizer.state_dict(),
             'scheduler_state_dict': self.scheduler.state_dict(),
+            'scaler_state_dict': self.scaler.state_dict(),
             'best_accuracy': self.best_accuracy,
             'history': history,
             'config': self.config
@@ -488,21 +981,30 @@ class ResNetTrainer:
         """Load training checkpoint."""
         checkpoint = torch.load(path, map_location=self.device)
         
-        self.model.load_state_dict(checkpoint['model_state_dict'])
+        self._unwrapped_model().load_state_dict(checkpoint['model_state_dict'])
         self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
         self.scheduler.load_state_dict(checkpoint['scheduler_state_dict'])
+        if 'scaler_state_dict' in checkpoint:
+            self.scaler.load_state_dict(checkpoint['scaler_state_dict'])
         self.best_accuracy = checkpoint['best_accuracy']
         
         return checkpoint['epoch'], checkpoint['history']
     
+    def save_history(self, path: Path, history: Dict):
+        """Atomically write training history as JSON."""
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(history, f)
+        os.replace(tmp_path, path)
+    
     def plot_training_curves(self, history: Dict, save_path: Path):
         """Plot training curves."""
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
         
         # Loss curves
         epochs = range(1, len(history['train_loss']) + 1)
-        ax1.plot(epochs, history['train_loss'], 'b-', label='Train Loss')
-        ax1.plot(epochs, history['val_loss'], 'r-', label='Val Loss')
+        ax1.plot(epochs, history['train_loss'], 'b-', label='Train Loss', rasterized=True)
+        ax1.plot(epochs, history['val_loss'], 'r-', label='Val Loss', rasterized=True)
         ax1.set_xlabel('Epoch')
         ax1.set_ylabel('Loss')
         ax1.set_title('Training and Validation Loss')
@@ -510,16 +1012,17 @@ class ResNetTrainer:
         ax1.grid(True)
         
         # Accuracy curves
-        ax2.plot(epochs, history['train_acc'], 'b-', label='Train Acc')
-        ax2.plot(epochs, history['val_acc'], 'r-', label='Val Acc')
+        ax2.plot(epochs, history['train_acc'], 'b-', label='Train Acc', rasterized=True)
+        ax2.plot(epochs, history['val_acc'], 'r-', label='Val Acc', rasterized=True)
         ax2.set_xlabel('Epoch')
         ax2.set_ylabel('Accuracy (%)')
         ax2.set_title('Training and Validation Accuracy')
         ax2.legend()
         ax2.grid(True)
         
-        plt.tight_layout()
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+        fig.tight_layout()
+        fig.savefig(save_path, dpi=100, bbox_inches='tight')
+        plt.close(fig)
         logger.info(f"Training curves saved to {save_path}")
     
     def evaluate_with_confusion_matrix(
@@ -530,20 +1033,33 @@ class ResNetTrainer:
     ):
         """Evaluate model and generate confusion matrix."""
         self.model.eval()
+        num_classes = len(class_names)
+        
+        # Everything stays on the device until the loop is done
+        cm = torch.zeros(num_classes, num_classes, dtype=torch.long, device=self.device)
         all_predictions = []
         all_targets = []
         
-        with torch.no_grad():
+        with torch.inference_mode(), torch.autocast(
+            device_type='cuda', dtype=torch.float16, enabled=self.use_amp
+        ):
             for inputs, targets in tqdm(test_loader, desc='Evaluation'):
-                inputs = inputs.to(self.device)
+                inputs = self._prepare_inputs(inputs)
+                targets = targets.to(self.device, non_blocking=True)
                 outputs = self.model(inputs)
-                _, predicted = outputs.max(1)
+                predicted = outputs.argmax(1)
                 
-                all_predictions.extend(predicted.cpu().numpy())
-                all_targets.extend(targets.numpy())
+                # Row = actual, column = predicted
+                cm += torch.bincount(
+                    num_classes * targets + predicted,
+                    minlength=num_classes * num_classes
+                ).view(num_classes, num_classes)
+                all_predictions.append(predicted)
+                all_targets.append(targets)
         
-        # Generate confusion matrix
-        cm = confusion_matrix(all_targets, all_predictions)
+        cm = cm.cpu().numpy()
+        all_predictions = torch.cat(all_predictions).cpu().numpy()
+        all_targets = torch.cat(all_targets).cpu().numpy()
         
         # Plot confusion matrix
         plt.figure(figsize=(15, 12))
@@ -569,6 +1085,7 @@ class ResNetTrainer:
         report = classification_report(
             all_targets,
             all_predictions,
+            labels=list(range(num_classes)),
             target_names=class_names,
             output_dict=True
         )
@@ -587,6 +1104,11 @@ def main():
     
     args = parser.parse_args()
     
+    # Join the process group when launched with torchrun --nproc_per_node=N
+    if int(os.environ.get('WORLD_SIZE', 1)) > 1:
+        dist.init_process_group(backend='nccl', init_method='env://')
+        torch.cuda.set_device(int(os.environ['LOCAL_RANK']))
+    
     # Initialize trainer
     trainer = ResNetTrainer(args.config)
     
@@ -596,13 +1118,27 @@ def main():
         trainer._setup_model()
         
         # Load best model
-        model_path = Path(trainer.config['save_dir']) / 'best_model.pth'
-        trainer.model.load_state_dict(torch.load(model_path))
+        save_dir = Path(trainer.config['save_dir'])
+        model = trainer._unwrapped_model()
+        model.load_state_dict(torch.load(save_dir / 'best_model.pth', map_location=trainer.device))
+        
+        # Freeze for inference: folds batchnorm into convs and drops Python
+        # dispatch. Evaluation only, a frozen module has no autograd.
+        model.eval()
+        scripted = torch.jit.script(model)
+        trainer.model = torch.jit.optimize_for_inference(torch.jit.freeze(scripted))
         
         # Evaluate
         test_loss, test_acc = trainer.validate(test_loader)
         logger.info(f"Test Loss: {test_loss:.4f}, Test Acc: {test_acc:.2f}%")
         
+        report = trainer.evaluate_with_confusion_matrix(
+            test_loader,
+            trainer.class_names,
+            save_dir / 'confusion_matrix.png'
+        )
+        logger.info(f"Macro F1: {report['macro avg']['f1-score']:.4f}")
+        
     else:
         # Train model
         if args.resume:
@@ -613,6 +1149,9 @@ def main():
             logger.info(f"Resuming from epoch {epoch}")
         
         trainer.train()
+    
+    if dist.is_initialized():
+        dist.destroy_process_group()
 
 
 if __name__ == '__main__':
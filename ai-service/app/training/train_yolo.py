@@ -3,22 +3,196 @@ YOLOv8 training script for automotive part detection.
 """
 
 import os
+import copy
+import atexit
+import shutil
+import hashlib
 import yaml
 import torch
+from torch.utils.checkpoint import checkpoint
 import argparse
 from pathlib import Path
 from ultralytics import YOLO
+from ultralytics.nn.modules import C2f, SPPF
+import PIL
 from typing import Dict, Any, Optional
 import logging
 from datetime import datetime
 import json
-import matplotlib.pyplot as plt
-import numpy as np
-from sklearn.model_selection import train_test_split
+
+from app.training.dali_dataloader import DALI_AVAILABLE, DALIDetectionLoader
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader, SafeDumper
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rough training images per GiB of free VRAM at 640px, keyed by model scale
+BATCH_PER_GIB = {'n': 2.0, 's': 1.5, 'm': 1.0, 'l': 0.6, 'x': 0.4}
+
+# Config keys consumed by YOLOTrainer itself; Ultralytics rejects unknown args
+TRAINER_ONLY_KEYS = {'tf32', 'cudnn_benchmark', 'scaler_init_scale', 'scaler_growth_interval',
+                     'amp_dtype', 'shm_cache', 'require_pillow_simd', 'prefetch',
+                     'compile', 'channels_last', 'fused_optimizer', 'dali',
+                     'grad_checkpoint'}
+
+# (title, y label, columns) for each panel of the training results plot
+RESULT_PANELS = [
+    ('Box Loss', 'Loss', ['train/box_loss']),
+    ('Classification Loss', 'Loss', ['train/cls_loss']),
+    ('Precision & Recall', 'Score', ['metrics/precision(B)', 'metrics/recall(B)']),
+    ('Mean Average Precision', 'mAP', ['metrics/mAP50(B)', 'metrics/mAP50-95(B)'])
+]
+
+# Training defaults; _load_config hands out deep copies
+DEFAULT_CONFIG = {
+    'model': 'yolov8n.pt',  # Base model
+    'data': 'automotive_parts.yaml',  # Dataset config
+    'epochs': 100,
+    'imgsz': 640,
+    'batch': -1,  # -1 sizes the batch from free VRAM
+    'patience': 50,
+    'save': True,
+    'device': 'auto',
+    # Dataloader workers per GPU, Ultralytics spawns them for each rank
+    'workers': min((os.cpu_count() or 1) // max(torch.cuda.device_count(), 1), 8) or 1,
+    'project': 'runs/train',
+    'name': 'automotive_parts',
+    'exist_ok': False,
+    'pretrained': True,
+    'optimizer': 'SGD',
+    'verbose': True,
+    'seed': 42,
+    'deterministic': False,  # Reproducible but slower, see _configure_backends
+    'single_cls': False,
+    'rect': False,
+    'cos_lr': False,
+    'close_mosaic': 10,
+    'resume': False,
+    'amp': True,
+    'fraction': 1.0,
+    'profile': False,
+    'freeze': None,
+    'lr0': 0.01,
+    'lrf': 0.01,
+    'momentum': 0.937,
+    'weight_decay': 0.0005,
+    'warmup_epochs': 3.0,
+    'warmup_momentum': 0.8,
+    'warmup_bias_lr': 0.1,
+    'box': 7.5,
+    'cls': 0.5,
+    'dfl': 1.5,
+    'pose': 12.0,
+    'kobj': 1.0,
+    'label_smoothing': 0.0,
+    'nbs': 64,
+    'hsv_h': 0.015,
+    'hsv_s': 0.7,
+    'hsv_v': 0.4,
+    'degrees': 0.0,
+    'translate': 0.1,
+    'scale': 0.5,
+    'shear': 0.0,
+    'perspective': 0.0,
+    'flipud': 0.0,
+    'fliplr': 0.5,
+    'mosaic': 1.0,
+    'mixup': 0.0,
+    'copy_paste': 0.0,
+    'auto_augment': 'randaugment',
+    'erasing': 0.4,
+    'crop_fraction': 1.0,
+    'tf32': True,  # TF32 matmul/conv on Ampere+ GPUs
+    'cudnn_benchmark': True,  # Autotune cuDNN conv algorithms
+    'scaler_init_scale': 2.0 ** 14,  # AMP loss scale, below the 2**16 default
+    'scaler_growth_interval': 2000,
+    'amp_dtype': 'auto',  # 'bf16', 'fp16' or 'auto' (bf16 on SM80+)
+    'cache': 'ram',  # Keep decoded images in RAM ('disk' for large datasets)
+    'shm_cache': False,  # Copy the prepared dataset into /dev/shm
+    'require_pillow_simd': False,  # Fail fast without pillow-simd (CI builds)
+    'prefetch': True,  # Overlap host-to-device copies with compute
+    'compile': True,  # torch.compile the network forward on CUDA
+    'channels_last': True,  # NHWC layout for tensor-core convs (CUDA + AMP)
+    'fused_optimizer': True,  # Multi-tensor SGD / fused AdamW kernels on CUDA
+    'dali': False,  # GPU decode/augment with DALI (no mosaic/mixup)
+    'grad_checkpoint': False  # Recompute C2f/SPPF activations to fit larger batches
+}
+
+# Set once Ultralytics' AMP sanity check has passed in this process
+_amp_verified = False
+
+
+def _skip_amp_check():
+    """Stop Ultralytics from re-running its AMP check on later trainings."""
+    global _amp_verified
+    if _amp_verified:
+        return
+    
+    import ultralytics.engine.trainer
+    import ultralytics.utils.checks
+    
+    # The trainer module holds its own reference to check_amp
+    ultralytics.engine.trainer.check_amp = lambda *args, **kwargs: True
+    ultralytics.utils.checks.check_amp = ultralytics.engine.trainer.check_amp
+    _amp_verified = True
+
+
+class DataPrefetcher:
+    """
+    Copies the next training batch to the GPU on a side CUDA stream while the
+    current batch is being processed.
+    """
+    
+    def __init__(self, loader, device: torch.device,
+                 memory_format: torch.memory_format = torch.contiguous_format):
+        """
+        Initialize the prefetcher.
+        
+        Args:
+            loader: Ultralytics training DataLoader (pinned memory)
+            device: CUDA device the batches are copied to
+            memory_format: Layout of the image tensors on the device
+        """
+        self.loader = loader
+        self.device = device
+        self.memory_format = memory_format
+        self.stream = torch.cuda.Stream(device)
+    
+    def __len__(self):
+        return len(self.loader)
+    
+    def __getattr__(self, name):
+        # The trainer also uses dataset, sampler and reset() of the loader
+        if name == 'loader':
+            raise AttributeError(name)
+        return getattr(self.loader, name)
+    
+    def _preload(self, iterator):
+        try:
+            batch = next(iterator)
+        except StopIteration:
+            return None
+        with torch.cuda.stream(self.stream):
+            batch['img'] = batch['img'].to(self.device, non_blocking=True,
+                                           memory_format=self.memory_format)
+        return batch
+    
+    def __iter__(self):
+        iterator = iter(self.loader)
+        batch = self._preload(iterator)
+        while batch is not None:
+            current = torch.cuda.current_stream(self.device)
+            current.wait_stream(self.stream)
+            # The image was allocated on the side stream but is freed on this one
+            batch['img'].record_stream(current)
+            next_batch = self._preload(iterator)
+            yield batch
+            batch = next_batch
+
 
 class YOLOTrainer:
     """
@@ -35,82 +209,351 @@ class YOLOTrainer:
         self.config = self._load_config(config_path)
         self.model = None
         self.results = None
+        self._base_model = None
         self.device = self._get_device()
+        self._configure_backends()
+        self._check_pillow_simd()
+        
+        # Mixed precision is always on for CUDA training
+        if self.device.type == 'cuda':
+            self.config['amp'] = True
         
     def _load_config(self, config_path: Optional[str]) -> Dict[str, Any]:
         """Load training configuration."""
-        default_config = {
-            'model': 'yolov8n.pt',  # Base model
-            'data': 'automotive_parts.yaml',  # Dataset config
-            'epochs': 100,
-            'imgsz': 640,
-            'batch': 16,
-            'patience': 50,
-            'save': True,
-            'device': 'auto',
-            'workers': 8,
-            'project': 'runs/train',
-            'name': 'automotive_parts',
-            'exist_ok': False,
-            'pretrained': True,
-            'optimizer': 'SGD',
-            'verbose': True,
-            'seed': 42,
-            'deterministic': True,
-            'single_cls': False,
-            'rect': False,
-            'cos_lr': False,
-            'close_mosaic': 10,
-            'resume': False,
-            'amp': True,
-            'fraction': 1.0,
-            'profile': False,
-            'freeze': None,
-            'lr0': 0.01,
-            'lrf': 0.01,
-            'momentum': 0.937,
-            'weight_decay': 0.0005,
-            'warmup_epochs': 3.0,
-            'warmup_momentum': 0.8,
-            'warmup_bias_lr': 0.1,
-            'box': 7.5,
-            'cls': 0.5,
-            'dfl': 1.5,
-            'pose': 12.0,
-            'kobj': 1.0,
-            'label_smoothing': 0.0,
-            'nbs': 64,
-            'hsv_h': 0.015,
-            'hsv_s': 0.7,
-            'hsv_v': 0.4,
-            'degrees': 0.0,
-            'translate': 0.1,
-            'scale': 0.5,
-            'shear': 0.0,
-            'perspective': 0.0,
-            'flipud': 0.0,
-            'fliplr': 0.5,
-            'mosaic': 1.0,
-            'mixup': 0.0,
-            'copy_paste': 0.0,
-            'auto_augment': 'randaugment',
-            'erasing': 0.4,
-            'crop_fraction': 1.0
-        }
+        default_config = copy.deepcopy(DEFAULT_CONFIG)
         
         if config_path and os.path.exists(config_path):
             with open(config_path, 'r') as f:
-                custom_config = yaml.safe_load(f)
+                custom_config = yaml.load(f, Loader=SafeLoader)
                 default_config.update(custom_config)
         
         return default_config
     
     def _get_device(self) -> torch.device:
-        """Determine the device to use for training."""
-        device_config = self.config.get('device', 'auto')
+        """
+        Determine the device to use for training.
+        
+        config['device'] is resolved to the Ultralytics form ('cpu', '0' or
+        '0,1,2,3'). 'auto' picks a single GPU; DDP is opt-in through an
+        explicit comma separated list, since Ultralytics runs it in a
+        subprocess that drops the trainer callbacks. The returned device is
+        the first (rank 0) GPU.
+        """
+        device_config = str(self.config.get('device', 'auto'))
         if device_config == 'auto':
-            return torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        return torch.device(device_config)
+            device_config = '0' if torch.cuda.is_available() else 'cpu'
+            self.config['device'] = device_config
+        
+        devices = [d.strip() for d in device_config.split(',') if d.strip()]
+        first = devices[0]
+        device = torch.device(f'cuda:{first}' if first.isdigit() else first)
+        
+        if len(devices) > 1:
+            self._configure_ddp(len(devices))
+        
+        # BF16 has the FP32 exponent range, so it needs no loss scaling
+        if self.config.get('amp_dtype', 'auto') == 'auto':
+            bf16 = (device.type == 'cuda'
+                    and torch.cuda.get_device_capability(device)[0] >= 8
+                    and torch.cuda.is_bf16_supported())
+            self.config['amp_dtype'] = 'bf16' if bf16 else 'fp16'
+        
+        return device
+    
+    def _configure_ddp(self, world_size: int):
+        """Set NCCL defaults for multi-GPU training."""
+        os.environ.setdefault('NCCL_P2P_DISABLE', '0')
+        os.environ.setdefault('NCCL_IB_DISABLE', '0')
+        os.environ.setdefault('TORCH_NCCL_ASYNC_ERROR_HANDLING', '1')
+        os.environ.setdefault('NCCL_ASYNC_ERROR_HANDLING', '1')  # torch<2.2
+        
+        logger.info(f"Training on {world_size} GPUs with DDP")
+        logger.warning("Rank 0 also holds the EMA model, validation and checkpointing, "
+                       "so it needs more memory than the other GPUs; size the batch for it")
+        logger.warning("Ultralytics runs DDP in a subprocess, so the trainer callbacks "
+                       "(BF16, prefetching, compile, fused optimizer, DALI) are not applied")
+    
+    def _configure_backends(self):
+        """
+        Enable TF32 and cuDNN autotuning on CUDA devices.
+        
+        TF32 keeps the FP32 exponent range but rounds the mantissa to 10 bits
+        inside matmuls and convolutions, trading ~1e-3 relative precision for
+        up to ~2x faster FP32 math on Ampere and newer GPUs. cuDNN benchmark
+        times the available conv algorithms for each new input shape and
+        caches the fastest one, which is not bitwise reproducible. Both are
+        turned off when deterministic training is requested.
+        """
+        if self.config.get('deterministic'):
+            logger.warning("deterministic=True disables cuDNN benchmark + TF32; "
+                           "expect ~30% slower training")
+            # cuBLAS needs a fixed workspace for reproducible results
+            os.environ.setdefault('CUBLAS_WORKSPACE_CONFIG', ':4096:8')
+            torch.use_deterministic_algorithms(True, warn_only=True)
+            torch.backends.cuda.matmul.allow_tf32 = False
+            torch.backends.cudnn.allow_tf32 = False
+            torch.backends.cudnn.benchmark = False
+            return
+        
+        if self.device.type != 'cuda':
+            return
+        
+        if self.config.get('tf32', True):
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+        if self.config.get('cudnn_benchmark', True):
+            torch.backends.cudnn.benchmark = True
+    
+    def _check_pillow_simd(self):
+        """Report whether the SIMD build of Pillow is installed."""
+        # pillow-simd releases carry a .postN suffix
+        if '.post' in PIL.__version__:
+            logger.info(f"Using pillow-simd {PIL.__version__}")
+            return
+        
+        message = (f"Stock Pillow {PIL.__version__} detected; install pillow-simd "
+                   "for faster JPEG decode and augmentation (see requirements.txt)")
+        if self.config.get('require_pillow_simd'):
+            raise RuntimeError(message)
+        logger.warning(message)
+    
+    def _load_base_model(self) -> YOLO:
+        """Return a fresh copy of the base model, reading the weights only once."""
+        if self._base_model is None:
+            logger.info(f"Loading base model: {self.config['model']}")
+            self._base_model = YOLO(self.config['model'])
+        # Training mutates the model, so every run gets its own copy
+        return copy.deepcopy(self._base_model)
+    
+    def _autoscale_batch(self):
+        """
+        Resolve batch=-1 to a batch size that fits in free GPU memory.
+        
+        Single-GPU runs keep -1 so Ultralytics AutoBatch measures the real
+        footprint. AutoBatch does not support multi-GPU training, so there
+        the batch is estimated from free VRAM per device instead. Ultralytics
+        accumulates gradients over nbs // batch steps either way, so the
+        effective batch size stays at nbs.
+        """
+        if self.config['batch'] != -1 or self.device.type != 'cuda':
+            return
+        
+        devices = [d for d in str(self.config['device']).split(',') if d.strip()]
+        if len(devices) < 2:
+            return
+        
+        scale = Path(str(self.config['model'])).stem[-1]
+        per_gib = BATCH_PER_GIB.get(scale, BATCH_PER_GIB['n'])
+        per_gib *= (640 / self.config['imgsz']) ** 2
+        free_gib = min(torch.cuda.mem_get_info(int(d))[0] for d in devices) / 2 ** 30
+        
+        # Largest power of two that fits on the smallest device
+        per_device = max(4, min(256, int(free_gib * per_gib)))
+        per_device = 2 ** (per_device.bit_length() - 1)
+        batch = per_device * len(devices)
+        accumulate = max(round(self.config['nbs'] / batch), 1)
+        
+        self.config['batch'] = batch
+        logger.info(f"Auto batch size {batch} ({per_device} per GPU), accumulate {accumulate}")
+    
+    def _train_args(self, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Return the config without the keys Ultralytics does not accept."""
+        config = self.config if config is None else config
+        args = {k: v for k, v in config.items() if k not in TRAINER_ONLY_KEYS}
+        if config.get('dali'):
+            # DALI decodes from disk itself; caching for the replaced loader is wasted
+            args['cache'] = False
+        if config.get('shm_cache'):
+            args['data'] = self._shm_data_config(args['data'])
+        return args
+    
+    def _shm_data_config(self, data: str) -> str:
+        """
+        Point a dataset config at a /dev/shm copy of its images and labels.
+        
+        The saved config keeps the on-disk root, since the copy only lives as
+        long as this process; the trainer gets a config written next to the copy.
+        """
+        with open(data) as f:
+            dataset_config = yaml.load(f, Loader=SafeLoader)
+        dataset_path = Path(dataset_config.get('path') or Path(data).parent)
+        
+        shm_path = self._copy_to_shm(dataset_path)
+        if shm_path == str(dataset_path):
+            return data
+        
+        dataset_config['path'] = shm_path
+        shm_config = Path(shm_path) / Path(data).name
+        with open(shm_config, 'w') as f:
+            yaml.dump(dataset_config, f, Dumper=SafeDumper)
+        return str(shm_config)
+    
+    def _register_callbacks(self, model: YOLO):
+        """Attach the trainer callbacks to an Ultralytics model."""
+        model.add_callback('on_pretrain_routine_end', self._on_pretrain_routine_end)
+        model.add_callback('on_train_start', self._on_train_start)
+        model.add_callback('on_train_epoch_end', self._on_train_epoch_end)
+    
+    def _on_pretrain_routine_end(self, trainer):
+        """Adjust the Ultralytics trainer once its optimizer exists."""
+        if self.config.get('fused_optimizer') and trainer.device.type == 'cuda':
+            self._fuse_optimizer(trainer)
+    
+    def _fuse_optimizer(self, trainer):
+        """Rebuild the optimizer to update all parameters in a few kernels."""
+        optimizer = trainer.optimizer
+        if isinstance(optimizer, torch.optim.SGD):
+            optimizer_cls, kernel = torch.optim.SGD, {'foreach': True}
+        elif isinstance(optimizer, (torch.optim.Adam, torch.optim.AdamW)):
+            optimizer_cls, kernel = type(optimizer), {'fused': True}
+        else:
+            return
+        
+        # Keep the Ultralytics param groups (decay / no decay / bias) but drop
+        # their per-group kernel choice so the constructor argument applies
+        groups = [{k: v for k, v in group.items() if k not in ('foreach', 'fused')}
+                  for group in optimizer.param_groups]
+        fused_optimizer = optimizer_cls(groups, **kernel)
+        
+        # Carry over resumed state; fused Adam keeps its step count on device
+        for param, state in optimizer.state.items():
+            if kernel.get('fused') and 'step' in state:
+                state['step'] = state['step'].to(param.device, torch.float32)
+            fused_optimizer.state[param] = state
+        
+        # Point the existing scheduler at the new optimizer; rebuilding it would
+        # restart the LR schedule of a resumed run at epoch 0
+        trainer.optimizer = fused_optimizer
+        trainer.scheduler.optimizer = fused_optimizer
+        logger.info(f"Using {optimizer_cls.__name__} with {next(iter(kernel))} kernels")
+    
+    def _on_train_start(self, trainer):
+        """Adjust the Ultralytics trainer before the first epoch."""
+        self._setup_precision(trainer)
+        
+        memory_format = torch.contiguous_format
+        if self.config.get('channels_last') and trainer.device.type == 'cuda' and trainer.amp:
+            # cuDNN runs FP16/BF16 convs natively in NHWC; convert before compiling
+            memory_format = torch.channels_last
+            trainer.model.to(memory_format=memory_format)
+            trainer.ema.ema.to(memory_format=memory_format)
+        
+        if self.config.get('grad_checkpoint'):
+            self._enable_grad_checkpointing(trainer)
+        
+        use_dali = self.config.get('dali') and trainer.device.type == 'cuda'
+        if use_dali and not DALI_AVAILABLE:
+            logger.warning("DALI unavailable, falling back to the Ultralytics data pipeline")
+            use_dali = False
+        prefetch = self.config.get('prefetch') and trainer.device.type == 'cuda' and not use_dali
+        
+        if self.config.get('compile') and trainer.device.type == 'cuda':
+            # Only the prefetcher delivers images in the model's memory format
+            self._compile_model(trainer, memory_format if prefetch else torch.contiguous_format)
+        
+        if use_dali:
+            self._setup_dali_loader(trainer)
+        elif prefetch:
+            trainer.train_loader = DataPrefetcher(trainer.train_loader, trainer.device, memory_format)
+    
+    def _setup_dali_loader(self, trainer):
+        """Replace the training DataLoader with a GPU-side DALI pipeline."""
+        hyp = {k: getattr(trainer.args, k) for k in ('hsv_h', 'hsv_s', 'hsv_v', 'fliplr', 'scale')}
+        trainer.train_loader = DALIDetectionLoader(
+            trainer.train_loader.dataset,
+            batch_size=trainer.batch_size,
+            num_threads=max(trainer.args.workers, 1),
+            device_id=trainer.device.index or 0,
+            imgsz=trainer.args.imgsz,
+            hyp=hyp,
+            seed=trainer.args.seed
+        )
+        # Batches already live on the GPU, so no prefetcher is needed
+        logger.warning("Training with DALI: mosaic and mixup are not applied")
+    
+    def _setup_precision(self, trainer):
+        """Set up the mixed precision mode for the training loop."""
+        if trainer.amp and self.config['amp_dtype'] == 'bf16':
+            # Ultralytics autocasts to FP16; a nested BF16 autocast takes
+            # precedence and the scaler becomes a no-op
+            forward = trainer.model.forward
+            
+            def bf16_forward(*args, **kwargs):
+                with torch.autocast(device_type='cuda', dtype=torch.bfloat16):
+                    return forward(*args, **kwargs)
+            
+            trainer.model.forward = bf16_forward
+            trainer.scaler = torch.cuda.amp.GradScaler(enabled=False)
+            logger.info("Training with BF16 autocast")
+            return
+        
+        # A lower initial scale and slower growth avoid the overflow/skip/halve
+        # cycle the default scaler goes through on loss spikes
+        trainer.scaler = torch.cuda.amp.GradScaler(
+            init_scale=self.config['scaler_init_scale'],
+            growth_factor=2.0,
+            backoff_factor=0.5,
+            growth_interval=self.config['scaler_growth_interval'],
+            enabled=bool(trainer.amp)
+        )
+    
+    def _enable_grad_checkpointing(self, trainer):
+        """
+        Recompute C2f and SPPF activations during backward instead of storing them.
+        
+        The blocks are checkpointed one by one rather than with
+        checkpoint_sequential because YOLO layers feed later layers through
+        skip connections. Their BatchNorm statistics are updated on both the
+        forward pass and the recomputation.
+        """
+        model = getattr(trainer.model, 'module', trainer.model)
+        blocks = [m for m in model.model if isinstance(m, (C2f, SPPF))]
+        for block in blocks:
+            forward = block.forward
+            
+            def checkpointed_forward(x, forward=forward):
+                if torch.is_grad_enabled():
+                    # Non-reentrant checkpointing also works under torch.compile
+                    return checkpoint(forward, x, use_reentrant=False)
+                return forward(x)
+            
+            block.forward = checkpointed_forward
+        logger.info(f"Gradient checkpointing enabled for {len(blocks)} blocks")
+    
+    def _compile_model(self, trainer, input_format: torch.memory_format = torch.contiguous_format):
+        """
+        Compile the network forward with Inductor and warm it up.
+        
+        Only predict() is compiled: the loss path sees a different number of
+        targets every batch and would keep recompiling. The shapes are fixed
+        by imgsz, so dynamic shapes are disabled. The warm-up batch uses the
+        memory format of the real inputs, or the stride guards would trigger
+        a second compile on the first batch.
+        """
+        if not hasattr(torch, 'compile'):
+            logger.warning("torch.compile needs torch>=2.0, training eagerly")
+            return
+        
+        model = getattr(trainer.model, 'module', trainer.model)
+        model.predict = torch.compile(model.predict, mode='max-autotune', fullgraph=False, dynamic=False)
+        
+        # Warm up so compilation is not billed to the first epoch; the dummy
+        # batch must not leak into the BatchNorm running statistics
+        stats = {k: v.clone() for k, v in model.state_dict().items()
+                 if 'running_' in k or 'num_batches_tracked' in k}
+        imgsz = trainer.args.imgsz
+        dummy = torch.zeros(trainer.batch_size, 3, imgsz, imgsz, device=trainer.device,
+                            memory_format=input_format)
+        dtype = torch.bfloat16 if self.config['amp_dtype'] == 'bf16' else torch.float16
+        with torch.autocast(device_type='cuda', dtype=dtype, enabled=bool(trainer.amp)):
+            model(dummy)
+        model.load_state_dict(stats, strict=False)
+        logger.info("Model compiled with torch.compile")
+    
+    def _on_train_epoch_end(self, trainer):
+        """Log the AMP loss scale once per epoch."""
+        if trainer.scaler.is_enabled():
+            logger.info(f"Epoch {trainer.epoch + 1} AMP loss scale: {trainer.scaler.get_scale():.0f}")
     
     def prepare_dataset(self, data_dir: str, output_dir: str):
         """
@@ -171,11 +614,57 @@ class YOLOTrainer:
         # Save dataset configuration
         config_path = output_path / 'automotive_parts.yaml'
         with open(config_path, 'w') as f:
-            yaml.dump(dataset_config, f)
+            yaml.dump(dataset_config, f, Dumper=SafeDumper)
         
         logger.info(f"Dataset configuration saved to {config_path}")
         return str(config_path)
     
+    def _copy_to_shm(self, dataset_path: Path) -> str:
+        """
+        Copy images and labels into /dev/shm so epochs never touch the disk.
+        
+        Args:
+            dataset_path: Prepared YOLO dataset directory
+            
+        Returns:
+            Dataset root to use, the original one if /dev/shm cannot hold it
+        """
+        shm_root = Path('/dev/shm')
+        if not shm_root.is_dir():
+            logger.warning("/dev/shm not available, reading dataset from disk")
+            return str(dataset_path)
+        
+        files = sorted(
+            (f, f.stat())
+            for sub in ('images', 'labels')
+            for f in (dataset_path / sub).rglob('*') if f.is_file()
+        )
+        manifest = '\n'.join(
+            f'{f.relative_to(dataset_path)}\t{st.st_size}\t{st.st_mtime_ns}' for f, st in files
+        )
+        
+        digest = hashlib.md5(str(dataset_path.resolve()).encode()).hexdigest()[:8]
+        shm_path = shm_root / f'automotive_parts_{digest}'
+        manifest_path = shm_path / 'manifest.txt'
+        atexit.register(shutil.rmtree, shm_path, ignore_errors=True)
+        if manifest_path.exists() and manifest_path.read_text() == manifest:
+            # The copy from an earlier run (e.g. a tuning trial) is still current
+            return str(shm_path)
+        
+        dataset_bytes = sum(st.st_size for _, st in files)
+        if shutil.disk_usage(shm_root).free < dataset_bytes * 1.2:
+            logger.warning("Not enough space in /dev/shm, reading dataset from disk")
+            return str(dataset_path)
+        
+        # Start from scratch so files removed from the dataset do not linger
+        shutil.rmtree(shm_path, ignore_errors=True)
+        for sub in ('images', 'labels'):
+            shutil.copytree(dataset_path / sub, shm_path / sub)
+        manifest_path.write_text(manifest)
+        
+        logger.info(f"Copied {dataset_bytes / 2 ** 20:.0f} MiB of data to {shm_path}")
+        return str(shm_path)
+    
     def train(self, resume: bool = False):
         """
         Train the YOLOv8 model.
@@ -190,14 +679,22 @@ class YOLOTrainer:
             logger.info("Resuming from previous training")
             self.model = YOLO('runs/train/automotive_parts/weights/last.pt')
         else:
-            logger.info(f"Loading base model: {self.config['model']}")
-            self.model = YOLO(self.config['model'])
+            self.model = self._load_base_model()
         
         # Update config for resuming
         self.config['resume'] = resume
+        self._configure_backends()
+        self._autoscale_batch()
+        if self.device.type == 'cuda':
+            # Dataloader workers do the CPU work; keep OpenMP/MKL pools here and
+            # in spawned processes from oversubscribing the cores
+            os.environ.setdefault('OMP_NUM_THREADS', '1')
+            os.environ.setdefault('MKL_NUM_THREADS', '1')
+            torch.set_num_threads(1)
+        self._register_callbacks(self.model)
         
         # Train the model
-        self.results = self.model.train(**self.config)
+        self.results = self.model.train(**self._train_args())
         
         logger.info("Training completed!")
         return self.results
@@ -219,7 +716,7 @@ class YOLOTrainer:
         model = YOLO(model_path)
         
         # Run validation
-        metrics = model.val(data=self.config['data'])
+        metrics = model.val(data=self.config['data'], half=self.device.type == 'cuda')
         
         # Log metrics
         logger.info(f"mAP50: {metrics.box.map50:.4f}")
@@ -227,13 +724,22 @@ class YOLOTrainer:
         
         return metrics
     
-    def export_model(self, format: str = 'onnx', model_path: Optional[str] = None):
+    def export_model(self, format: str = 'onnx', model_path: Optional[str] = None,
+                     int8: bool = False, half: Optional[bool] = None, dynamic: Optional[bool] = None,
+                     simplify: bool = True, data: Optional[str] = None):
         """
         Export the trained model to different formats.
         
         Args:
             format: Export format ('onnx', 'torchscript', 'coreml', 'tflite')
             model_path: Path to model weights
+            int8: Quantize weights to INT8 (formats with INT8 support)
+            half: Export FP16 weights on the GPU, ignored when int8 is set. Defaults
+                to False for ONNX, whose FP16 copy model-server.py makes itself with
+                FP32 I/O, and to True for other formats when CUDA is available
+            dynamic: Allow dynamic batch and image sizes, defaults to ``not half``
+            simplify: Simplify the exported ONNX graph
+            data: Dataset YAML used to calibrate INT8 (defaults to config data)
         """
         if model_path is None:
             model_path = 'runs/train/automotive_parts/weights/best.pt'
@@ -241,11 +747,36 @@ class YOLOTrainer:
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model not found at {model_path}")
         
-        logger.info(f"Exporting model to {format} format")
+        data = data or self.config.get('data')
+        if int8 and not data:
+            raise ValueError("INT8 export needs a dataset for calibration")
+        
+        if half is None:
+            half = format != 'onnx' and self.device.type == 'cuda'
+        half = half and not int8
+        if half and self.device.type != 'cuda':
+            logger.warning("FP16 export needs a CUDA device, exporting FP32")
+            half = False
+        if dynamic is None:
+            dynamic = not half
+        if half and dynamic and format == 'onnx':
+            raise ValueError("Ultralytics cannot export ONNX with both half and dynamic")
+        
+        logger.info(f"Exporting model to {format} format (int8={int8}, half={half}, dynamic={dynamic})")
         model = YOLO(model_path)
         
-        # Export model
-        export_path = model.export(format=format)
+        # Export model; FP16 export only happens on the GPU
+        export_args = {'device': self.device.index or 0} if half else {}
+        export_path = model.export(
+            format=format,
+            imgsz=self.config['imgsz'],
+            int8=int8,
+            half=half,
+            dynamic=dynamic,
+            simplify=simplify,
+            data=data,
+            **export_args
+        )
         logger.info(f"Model exported to: {export_path}")
         
         return export_path
@@ -263,118 +794,111 @@ class YOLOTrainer:
             logger.warning("Results file not found")
             return
         
-        # Read results
+        # Imported here so training, validation and export start faster
+        import matplotlib
+        if save_path:
+            # Rendering to a file needs no GUI toolkit
+            matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
         import pandas as pd
-        df = pd.read_csv(results_path)
-        df.columns = [col.strip() for col in df.columns]
+        
+        # Read only the plotted columns; older Ultralytics pads the headers
+        wanted = {col for _, _, cols in RESULT_PANELS for col in cols}
+        df = pd.read_csv(results_path, usecols=lambda col: col.strip() in wanted)
+        df.columns = df.columns.str.strip()
         
         # Create figure with subplots
         fig, axes = plt.subplots(2, 2, figsize=(12, 10))
         fig.suptitle('YOLOv8 Training Results', fontsize=16)
         
-        # Plot loss curves
-        if 'train/box_loss' in df.columns:
-            axes[0, 0].plot(df.index, df['train/box_loss'], label='Box Loss')
-            axes[0, 0].set_title('Box Loss')
-            axes[0, 0].set_xlabel('Epoch')
-            axes[0, 0].set_ylabel('Loss')
-            axes[0, 0].legend()
-            axes[0, 0].grid(True)
-        
-        if 'train/cls_loss' in df.columns:
-            axes[0, 1].plot(df.index, df['train/cls_loss'], label='Class Loss')
-            axes[0, 1].set_title('Classification Loss')
-            axes[0, 1].set_xlabel('Epoch')
-            axes[0, 1].set_ylabel('Loss')
-            axes[0, 1].legend()
-            axes[0, 1].grid(True)
-        
-        # Plot metrics
-        if 'metrics/precision(B)' in df.columns:
-            axes[1, 0].plot(df.index, df['metrics/precision(B)'], label='Precision')
-            axes[1, 0].plot(df.index, df['metrics/recall(B)'], label='Recall')
-            axes[1, 0].set_title('Precision & Recall')
-            axes[1, 0].set_xlabel('Epoch')
-            axes[1, 0].set_ylabel('Score')
-            axes[1, 0].legend()
-            axes[1, 0].grid(True)
-        
-        if 'metrics/mAP50(B)' in df.columns:
-            axes[1, 1].plot(df.index, df['metrics/mAP50(B)'], label='mAP50')
-            axes[1, 1].plot(df.index, df['metrics/mAP50-95(B)'], label='mAP50-95')
-            axes[1, 1].set_title('Mean Average Precision')
-            axes[1, 1].set_xlabel('Epoch')
-            axes[1, 1].set_ylabel('mAP')
-            axes[1, 1].legend()
-            axes[1, 1].grid(True)
+        for ax, (title, ylabel, cols) in zip(axes.ravel(), RESULT_PANELS):
+            cols = df.columns.intersection(cols)
+            if cols.empty:
+                continue
+            df[cols].plot(ax=ax, title=title, xlabel='Epoch', ylabel=ylabel, grid=True)
         
         plt.tight_layout()
         
         if save_path:
             plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            plt.close(fig)
             logger.info(f"Plot saved to {save_path}")
         else:
             plt.show()
     
     def hyperparameter_tuning(self, n_trials: int = 10):
         """
-        Perform hyperparameter tuning using Ray Tune or similar.
+        Perform hyperparameter tuning with Optuna.
+        
+        Trials are sampled with TPE and pruned when their per-epoch mAP50
+        falls below the median of earlier trials. The study is stored in
+        tune.db so an interrupted search resumes where it stopped.
         
         Args:
             n_trials: Number of trials to run
         """
-        logger.info(f"Starting hyperparameter tuning with {n_trials} trials")
-        
-        # Define hyperparameter search space
-        search_space = {
-            'lr0': [0.001, 0.01, 0.1],
-            'momentum': [0.9, 0.937, 0.95],
-            'weight_decay': [0.0001, 0.0005, 0.001],
-            'warmup_epochs': [1, 3, 5],
-            'box': [5.0, 7.5, 10.0],
-            'cls': [0.3, 0.5, 0.7]
-        }
+        import optuna
         
-        # This is a simplified version. In production, use Ray Tune or Optuna
-        best_map = 0
-        best_params = {}
+        logger.info(f"Starting hyperparameter tuning with {n_trials} trials")
         
-        for trial in range(n_trials):
+        def objective(trial: 'optuna.Trial') -> float:
             # Sample hyperparameters
-            trial_params = {}
-            for param, values in search_space.items():
-                trial_params[param] = np.random.choice(values)
-            
-            logger.info(f"Trial {trial + 1}: {trial_params}")
+            trial_params = {
+                'lr0': trial.suggest_float('lr0', 1e-4, 1e-1, log=True),
+                'momentum': trial.suggest_float('momentum', 0.85, 0.98),
+                'weight_decay': trial.suggest_float('weight_decay', 1e-5, 1e-3, log=True),
+                'warmup_epochs': trial.suggest_float('warmup_epochs', 0.0, 5.0),
+                'box': trial.suggest_float('box', 5.0, 10.0),
+                'cls': trial.suggest_float('cls', 0.3, 1.0)
+            }
+            logger.info(f"Trial {trial.number}: {trial_params}")
             
             # Update config
             trial_config = self.config.copy()
             trial_config.update(trial_params)
             trial_config['epochs'] = 30  # Shorter for tuning
-            trial_config['name'] = f'trial_{trial}'
+            trial_config['name'] = f'trial_{trial.number}'
+            # Callbacks only run in-process, so trials never use DDP
+            trial_config['device'] = str(self.device.index or 0) if self.device.type == 'cuda' else 'cpu'
             
-            # Train with trial parameters
-            try:
-                model = YOLO(self.config['model'])
-                results = model.train(**trial_config)
-                
-                # Get validation mAP
-                metrics = model.val(data=trial_config['data'])
-                map50 = metrics.box.map50
-                
-                if map50 > best_map:
-                    best_map = map50
-                    best_params = trial_params
-                    logger.info(f"New best mAP50: {map50:.4f}")
-                
-            except Exception as e:
-                logger.error(f"Trial {trial} failed: {str(e)}")
-                continue
-        
-        logger.info(f"Best parameters: {best_params}")
-        logger.info(f"Best mAP50: {best_map:.4f}")
-        
-        return best_params
+            def report_epoch(trainer):
+                trial.report((trainer.metrics or {}).get('metrics/mAP50(B)', 0.0), trainer.epoch)
+                if trial.should_prune():
+                    raise optuna.TrialPruned()
+            
+            model = self._load_base_model()
+            self._register_callbacks(model)
+            model.add_callback('on_fit_epoch_end', report_epoch)
+            model.train(**self._train_args(trial_config))
+            
+            # The check runs a full forward pass; once it passed on this GPU,
+            # later trials skip it
+            if getattr(model.trainer, 'amp', False):
+                _skip_amp_check()
+            
+            # Metrics of the final validation on best.pt
+            return (model.trainer.metrics or {}).get('metrics/mAP50(B)', 0.0)
+        
+        study = optuna.create_study(
+            study_name=f"{self.config['name']}_tune",
+            storage='sqlite:///tune.db',
+            load_if_exists=True,
+            direction='maximize',
+            sampler=optuna.samplers.TPESampler(seed=self.config['seed']),
+            pruner=optuna.pruners.MedianPruner(n_warmup_steps=3)
+        )
+        # Failed trials are recorded and the search moves on
+        study.optimize(objective, n_trials=n_trials, catch=(Exception,))
+        
+        completed = study.get_trials(states=(optuna.trial.TrialState.COMPLETE,))
+        if not completed:
+            logger.warning("No tuning trial completed")
+            return {}
+        
+        logger.info(f"Best parameters: {study.best_params}")
+        logger.info(f"Best mAP50: {study.best_value:.4f}")
+        
+        return study.best_params
 
 
 def main():
@@ -386,6 +910,7 @@ def main():
     parser.add_argument('--validate', action='store_true', help='Run validation only')
     parser.add_argument('--export', type=str, choices=['onnx', 'torchscript', 'coreml', 'tflite'],
                         help='Export model to specified format')
+    parser.add_argument('--int8', action='store_true', help='Quantize the exported model to INT8')
     parser.add_argument('--tune', action='store_true', help='Run hyperparameter tuning')
     parser.add_argument('--plot', action='store_true', help='Plot training results')
     
@@ -399,7 +924,7 @@ def main():
         trainer.validate()
     elif args.export:
         # Export model
-        trainer.export_model(format=args.export)
+        trainer.export_model(format=args.export, int8=args.int8)
     elif args.tune:
         # Run hyperparameter tuning
         trainer.hyperparameter_tuning()
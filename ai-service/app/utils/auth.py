@@ -1,3 +1,5 @@
+import hmac
+
 from fastapi import HTTPException, Security, status
 from fastapi.security import APIKeyHeader
 from loguru import logger
@@ -6,12 +8,16 @@ from app.config import settings
 
 api_key_header = APIKeyHeader(name="X-API-Key")
 
+# Encoded once; compare_digest only accepts ASCII str, bytes work for any key
+_API_KEY = settings.API_KEY.encode()
+
 async def verify_api_key(api_key: str = Security(api_key_header)) -> str:
     """Verify API key for internal service authentication."""
-    if api_key != settings.API_KEY:
+    # Constant-time comparison so response timing does not leak the key
+    if not hmac.compare_digest((api_key or "").encode(), _API_KEY):
         logger.warning(f"Invalid API key attempt: {api_key[:10]}...")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
         )
-    return api_key
\ No newline at end of file
+    return api_key
@@ -4,23 +4,50 @@ Handles model loading, inference, and serving with optimizations
 """
 
 import os
+import math
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from pathlib import Path
 import numpy as np
 import torch
 import torch.nn as nn
-from torchvision import transforms
+import torch.nn.functional as F
+from torchvision.io import ImageReadMode, decode_image, decode_jpeg
 import onnxruntime as ort
-from PIL import Image
 import redis.asyncio as redis
-import json
+import orjson
+import xxhash
+from cachetools import TTLCache
 from datetime import datetime
 import aiofiles
 from prometheus_client import Counter, Histogram, Gauge
 import time
 
+try:
+    import tensorrt as trt
+    TRT_AVAILABLE = True
+except ImportError:
+    TRT_AVAILABLE = False
+
+try:
+    from onnxconverter_common import float16
+    FP16_CONVERTER_AVAILABLE = True
+except ImportError:
+    FP16_CONVERTER_AVAILABLE = False
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,6 +55,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Model input shape (C, H, W) produced by the preprocessing
+INPUT_SHAPE = (3, 640, 640)
+
+# ImageNet normalization applied to model inputs
+IMAGE_MEAN = (0.485, 0.456, 0.406)
+IMAGE_STD = (0.229, 0.224, 0.225)
+
+# Forward passes needed for JIT profiling and cuDNN autotuning to settle
+WARMUP_COUNT = 5
+
+# Batch sizes with a captured CUDA graph; batches are padded up to the next one
+GRAPH_BATCH_SIZES = (1, 2, 4, 8, 16)
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _normalize_chw(out, src, scale, shift):
+        """Scale uint8 CHW pixels into normalized floats in one pass"""
+        for c in range(src.shape[0]):
+            for i in prange(src.shape[1]):
+                for j in range(src.shape[2]):
+                    out[c, i, j] = src[c, i, j] * scale[c] + shift[c]
+else:
+    def _normalize_chw(out, src, scale, shift):
+        """Scale uint8 CHW pixels into normalized floats without temporaries"""
+        np.multiply(src, scale[:, None, None], out=out)
+        np.add(out, shift[:, None, None], out=out)
+
+
+def serialize_result(result: Dict[str, Any]) -> bytes:
+    """Encode an inference result as JSON, including its numpy detection columns"""
+    return orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY)
+
 # Metrics
 inference_counter = Counter('model_inference_total', 'Total model inferences', ['model_name', 'status'])
 inference_duration = Histogram('model_inference_duration_seconds', 'Model inference duration', ['model_name'])
@@ -43,26 +102,61 @@ class ModelServer:
         self.model_metadata = {}
         self.redis_client = None
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.inference_cache = {}
         self.cache_ttl = config.get('cache_ttl', 3600)  # 1 hour default
+        # In-process LRU cache of serialized results in front of Redis, expiring with the Redis entries
+        self.inference_cache = TTLCache(maxsize=config.get('local_cache_size', 1024), ttl=self.cache_ttl)
         
-        # Image preprocessing
-        self.image_transform = transforms.Compose([
-            transforms.Resize((640, 640)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
+        # Micro-batching: concurrent requests are coalesced per model
+        self.max_batch_size = config.get('max_batch_size', 16)
+        self.max_wait = config.get('max_wait_ms', 5) / 1000
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._batch_workers: Dict[str, asyncio.Task] = {}
+        
+        # Start inference without waiting for the Redis lookup; worth it when most requests miss
+        self.speculative_inference = config.get('speculative_inference', False)
+        
+        # FP16 halves memory traffic and runs on tensor cores; CPU stays FP32
+        self.precision = config.get('precision', 'fp16') if self.device.type == 'cuda' else 'fp32'
+        self.dtype = torch.float16 if self.precision == 'fp16' else torch.float32
+        
+        # Inputs have a fixed shape, so cuDNN can autotune once per conv
+        torch.backends.cudnn.benchmark = True
+        
+        # ONNX sessions share options and one CUDA stream, so they queue behind
+        # each other instead of contending for the device
+        self.ort_options = ort.SessionOptions()
+        self.ort_options.enable_mem_pattern = True
+        self.ort_options.enable_cpu_mem_arena = False
+        # Inputs are always INPUT_SHAPE; only the batch dimension stays dynamic for batching
+        self.ort_options.add_free_dimension_override_by_name('height', INPUT_SHAPE[1])
+        self.ort_options.add_free_dimension_override_by_name('width', INPUT_SHAPE[2])
+        self.ort_stream = torch.cuda.Stream() if self.device.type == 'cuda' else None
+        
+        # TensorRT expects one logger per process; models load concurrently in threads
+        self._trt_logger = trt.Logger(trt.Logger.WARNING) if TRT_AVAILABLE else None
+        
+        # Image preprocessing runs on the serving device
+        self.mean = torch.tensor(IMAGE_MEAN, device=self.device).view(1, 3, 1, 1)
+        self.std = torch.tensor(IMAGE_STD, device=self.device).view(1, 3, 1, 1)
+        
+        # CPU path folds /255, -mean and /std into one multiply-add per pixel
+        self.norm_scale = (1.0 / (255.0 * np.array(IMAGE_STD))).astype(np.float32)
+        self.norm_shift = (-np.array(IMAGE_MEAN) / np.array(IMAGE_STD)).astype(np.float32)
+        
+        # libjpeg-turbo decodes JPEGs on CPU-only hosts, downscaling during the IDCT
+        self.jpeg = None
+        if TURBOJPEG_AVAILABLE and self.device.type == 'cpu':
+            try:
+                self.jpeg = TurboJPEG()
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"libturbojpeg unavailable, decoding with torchvision: {e}")
         
         logger.info(f"Model server initialized on device: {self.device}")
     
     async def initialize(self):
         """Initialize model server components"""
-        # Connect to Redis for caching
-        self.redis_client = redis.from_url(
-            self.config['redis_url'],
-            encoding="utf-8",
-            decode_responses=True
-        )
+        # Connect to Redis for caching; results are stored as raw orjson bytes
+        self.redis_client = redis.from_url(self.config['redis_url'])
         await self.redis_client.ping()
         logger.info("Redis connection established")
         
@@ -92,13 +186,17 @@ class ModelServer:
             }
         ]
         
-        for model_config in model_configs:
-            try:
-                await self.load_model(model_config)
-                model_load_gauge.labels(model_name=model_config['name']).set(1)
-            except Exception as e:
-                logger.error(f"Failed to load model {model_config['name']}: {e}")
+        # Models load concurrently; one failure does not stop the others
+        results = await asyncio.gather(
+            *(self.load_model(model_config) for model_config in model_configs),
+            return_exceptions=True
+        )
+        for model_config, result in zip(model_configs, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to load model {model_config['name']}: {result}")
                 model_load_gauge.labels(model_name=model_config['name']).set(0)
+            else:
+                model_load_gauge.labels(model_name=model_config['name']).set(1)
     
     async def load_model(self, model_config: Dict[str, Any]):
         """Load a single model"""
@@ -108,64 +206,131 @@ class ModelServer:
         
         logger.info(f"Loading model: {name} ({model_type}) from {path}")
         
+        # Parsing, engine builds and graph capture block, so they run in worker threads
         if model_type == 'onnx':
-            # Load ONNX model
-            providers = ['CUDAExecutionProvider', 'CPUExecutionProvider'] if torch.cuda.is_available() else ['CPUExecutionProvider']
-            session = ort.InferenceSession(path, providers=providers)
-            self.models[name] = {
-                'session': session,
-                'type': 'onnx',
-                'input_name': session.get_inputs()[0].name,
-                'output_names': [out.name for out in session.get_outputs()]
-            }
+            model_info = await asyncio.to_thread(self._load_onnx_model, name, path)
         elif model_type == 'pytorch':
-            # Load PyTorch model
-            model = torch.load(path, map_location=self.device)
-            model.eval()
-            if torch.cuda.is_available():
-                model = model.cuda()
-            self.models[name] = {
-                'model': model,
-                'type': 'pytorch'
-            }
+            model_info = await asyncio.to_thread(self._load_pytorch_model, path)
+        else:
+            raise ValueError(f"Unknown model type: {model_type}")
+        model_info['name'] = name
+        self.models[name] = model_info
         
         # Store metadata
         self.model_metadata[name] = {
-            'classes': model_config.get('classes', []),
+            'classes': tuple(model_config.get('classes', ())),
             'loaded_at': datetime.now().isoformat(),
             'version': model_config.get('version', '1.0.0')
         }
         
         logger.info(f"Model {name} loaded successfully")
     
+    def _load_onnx_model(self, name: str, path: str) -> Dict[str, Any]:
+        """Load an ONNX model as a TensorRT engine when possible, else an ORT session"""
+        model_info = None
+        if TRT_AVAILABLE and self.device.type == 'cuda' and self.config.get('tensorrt', True):
+            try:
+                model_info = self._load_tensorrt_engine(path)
+            except Exception as e:
+                logger.warning(f"TensorRT engine unavailable for {name}, using ONNX Runtime: {e}")
+        
+        if model_info is None:
+            # Load ONNX model
+            session = None
+            if self.precision == 'fp16':
+                # Conversion or the FP16 graph itself can fail (e.g. Resize/Range nodes)
+                try:
+                    session = self._create_session(self._get_fp16_onnx(path))
+                except Exception as e:
+                    logger.warning(f"FP16 ONNX model unusable for {name}, serving FP32: {e}")
+            elif self.device.type == 'cpu' and self.config.get('int8', False):
+                # Opt-in: quantization trades accuracy for speed and the INT8 graph may not load
+                try:
+                    session = self._create_session(self._get_int8_onnx(name, path))
+                except Exception as e:
+                    logger.warning(f"INT8 ONNX model unusable for {name}, serving FP32: {e}")
+            if session is None:
+                session = self._create_session(path)
+            batch_dim = session.get_inputs()[0].shape[0]
+            model_info = {
+                'session': session,
+                'type': 'onnx',
+                'input_name': session.get_inputs()[0].name,
+                'output_names': [out.name for out in session.get_outputs()],
+                # Models exported with a fixed batch size cannot be batched further
+                'max_batch': batch_dim if isinstance(batch_dim, int) else self.max_batch_size,
+                'fixed_batch': isinstance(batch_dim, int),
+                'on_cuda': 'CUDAExecutionProvider' in session.get_providers(),
+                'bindings': {}  # input shape -> (IOBinding, device input buffer)
+            }
+        return model_info
+    
+    def _load_pytorch_model(self, path: str) -> Dict[str, Any]:
+        """Load, optimize and graph-capture a PyTorch model"""
+        # Load PyTorch model
+        model = torch.load(path, map_location=self.device)
+        model.eval()
+        if torch.cuda.is_available():
+            model = model.cuda()
+        model = model.to(self.dtype)
+        model = self._optimize_pytorch_model(model)
+        model_info = {
+            'model': model,
+            'type': 'pytorch',
+            'graphs': {}  # batch size -> captured CUDA graph
+        }
+        if self.device.type == 'cuda':
+            # Host inputs are staged in page-locked memory for async uploads
+            model_info['pinned_input'] = torch.empty(
+                (self.max_batch_size, *INPUT_SHAPE), dtype=self.dtype, pin_memory=True
+            )
+        if self.device.type == 'cuda' and self.config.get('cuda_graphs', True):
+            pool = None
+            for batch_size in GRAPH_BATCH_SIZES:
+                if batch_size > self.max_batch_size:
+                    break
+                runner = self._capture_cuda_graph(model, batch_size, pool)
+                if runner is None:
+                    break
+                model_info['graphs'][batch_size] = runner
+                pool = runner['graph'].pool()
+        
+        return model_info
+    
     @active_requests.track_inprogress()
-    async def predict(self, model_name: str, image_data: np.ndarray, **kwargs) -> Dict[str, Any]:
+    async def predict(self, model_name: str, image_data: Union[np.ndarray, torch.Tensor],
+                      cache_key: Optional[str] = None, **kwargs) -> Dict[str, Any]:
         """Run inference on a model"""
         start_time = time.time()
         
         try:
-            # Check cache first
-            cache_key = self._generate_cache_key(model_name, image_data)
-            cached_result = await self._get_cached_result(cache_key)
-            if cached_result:
-                inference_counter.labels(model_name=model_name, status='cache_hit').inc()
-                return cached_result
+            # Check cache first; device tensors are only cached under a caller-supplied key
+            if cache_key is None and isinstance(image_data, np.ndarray):
+                cache_key = self._generate_cache_key(model_name, image_data)
             
-            # Run inference
-            if model_name not in self.models:
-                raise ValueError(f"Model {model_name} not loaded")
-            
-            model_info = self.models[model_name]
-            
-            if model_info['type'] == 'onnx':
-                result = await self._predict_onnx(model_info, image_data, **kwargs)
-            elif model_info['type'] == 'pytorch':
-                result = await self._predict_pytorch(model_info, image_data, **kwargs)
+            if cache_key and self.speculative_inference:
+                if model_name not in self.models:
+                    raise ValueError(f"Model {model_name} not loaded")
+                result, cache_hit = await self._predict_speculative(model_name, image_data, cache_key, kwargs)
+                if cache_hit:
+                    inference_counter.labels(model_name=model_name, status='cache_hit').inc()
+                    return result
             else:
-                raise ValueError(f"Unknown model type: {model_info['type']}")
+                cached_result = await self._get_cached_result(cache_key) if cache_key else None
+                if cached_result:
+                    inference_counter.labels(model_name=model_name, status='cache_hit').inc()
+                    return cached_result
+                
+                # Run inference
+                if model_name not in self.models:
+                    raise ValueError(f"Model {model_name} not loaded")
+                
+                # Concurrent requests are coalesced into one forward pass
+                result = await self._submit(model_name, image_data, kwargs)
             
             # Cache result
-            await self._cache_result(cache_key, result)
+            if cache_key:
+                await self._cache_result(cache_key, result)
             
             # Record metrics
             duration = time.time() - start_time
@@ -179,86 +344,558 @@ class ModelServer:
             logger.error(f"Inference error for model {model_name}: {e}")
             raise
     
-    async def _predict_onnx(self, model_info: Dict, image_data: np.ndarray, **kwargs) -> Dict[str, Any]:
+    async def _predict_speculative(self, model_name: str, image_data: Union[np.ndarray, torch.Tensor],
+                                   cache_key: str, kwargs: Dict[str, Any]) -> tuple:
+        """Race the Redis lookup against inference, returning (result, cache_hit)"""
+        cached = self.inference_cache.get(cache_key)
+        if cached is not None:
+            return self._load_cached(cached), True
+        
+        cache_task = asyncio.create_task(self._get_cached_result(cache_key))
+        infer_task = asyncio.create_task(self._submit(model_name, image_data, kwargs))
+        try:
+            done, _ = await asyncio.wait({cache_task, infer_task}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            cache_task.cancel()
+            infer_task.cancel()
+            raise
+        
+        if cache_task in done:
+            cached_result = cache_task.result()
+            if cached_result:
+                # A request still queued is dropped by the batching worker
+                infer_task.cancel()
+                return cached_result, True
+            return await infer_task, False
+        
+        # Inference finished first, so the lookup can no longer help
+        cache_task.cancel()
+        return infer_task.result(), False
+    
+    async def _submit(self, model_name: str, image_data: Union[np.ndarray, torch.Tensor], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue one image for the model's batching worker and wait for its result"""
+        if len(image_data.shape) == 4:
+            if image_data.shape[0] != 1:
+                raise ValueError("predict takes a single image, use batch_predict for batches")
+            image_data = image_data[0]
+        
+        # A bad input would fail every request batched with it, so reject it here
+        if tuple(image_data.shape) != INPUT_SHAPE:
+            raise ValueError(f"Expected input shape {INPUT_SHAPE}, got {tuple(image_data.shape)}")
+        floating = (image_data.is_floating_point() if isinstance(image_data, torch.Tensor)
+                    else np.issubdtype(image_data.dtype, np.floating))
+        if not floating:
+            raise ValueError(f"Expected a floating point image, got {image_data.dtype}")
+        
+        if model_name not in self._queues:
+            self._queues[model_name] = asyncio.Queue()
+            self._batch_workers[model_name] = asyncio.create_task(self._batch_worker(model_name))
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queues[model_name].put((image_data, kwargs, future))
+        return await future
+    
+    async def _batch_worker(self, model_name: str):
+        """Collect queued requests into batches and run them"""
+        queue = self._queues[model_name]
+        loop = asyncio.get_running_loop()
+        max_batch = self.models[model_name].get('max_batch', self.max_batch_size)
+        
+        while True:
+            items = [await queue.get()]
+            
+            # Take whatever else arrives within max_wait, up to max_batch
+            deadline = loop.time() + self.max_wait
+            while len(items) < max_batch:
+                try:
+                    items.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    await asyncio.sleep(min(remaining, 0.001))
+            
+            items = [item for item in items if not item[2].done()]
+            if not items:
+                continue
+            
+            try:
+                results = self._run_batch(model_name, items)
+            except Exception as e:
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, _, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+    
+    def _run_batch(self, model_name: str, items: List) -> List[Dict[str, Any]]:
+        """Run one forward pass over queued requests and split the results"""
+        model_info = self.models[model_name]
+        images = [image for image, _, _ in items]
+        if any(isinstance(image, torch.Tensor) for image in images):
+            batch = torch.stack([torch.as_tensor(image).to(self.device, torch.float32) for image in images])
+        else:
+            batch = np.stack(images)
+        
+        # Round up to a bounded set of batch sizes so per-size bindings stay few and warm
+        if model_info['type'] in ('onnx', 'tensorrt'):
+            batch = self._pad_batch(batch, self._padded_batch_size(model_info, len(items)))
+        
+        if model_info['type'] == 'tensorrt':
+            outputs = self._predict_tensorrt(model_info, batch)
+        elif model_info['type'] == 'onnx':
+            outputs = self._predict_onnx(model_info, batch)
+        elif model_info['type'] == 'pytorch':
+            scores = self._predict_pytorch(model_info, batch)
+            if 'detector' not in model_info.get('name', ''):
+                return self._topk_classifications(scores, [kwargs for _, kwargs, _ in items])
+            outputs = [scores.float().cpu().numpy()]
+        else:
+            raise ValueError(f"Unknown model type: {model_info['type']}")
+        
+        # Each request is post-processed with its own options
+        return [
+            self._process_model_output(model_info, [output[i] for output in outputs], **kwargs)
+            for i, (_, kwargs, _) in enumerate(items)
+        ]
+    
+    def _padded_batch_size(self, model_info: Dict, n: int) -> int:
+        """Batch size an ONNX/TensorRT model runs n requests at"""
+        max_batch = model_info.get('max_batch', self.max_batch_size)
+        if model_info.get('fixed_batch'):
+            return max_batch
+        return next((size for size in GRAPH_BATCH_SIZES if n <= size <= max_batch), max_batch)
+    
+    def _pad_batch(self, batch: Union[np.ndarray, torch.Tensor], size: int) -> Union[np.ndarray, torch.Tensor]:
+        """Pad a batch with zero images up to size; padded outputs are ignored"""
+        missing = size - batch.shape[0]
+        if missing <= 0:
+            return batch
+        if isinstance(batch, torch.Tensor):
+            return torch.cat([batch, batch.new_zeros((missing, *batch.shape[1:]))])
+        return np.concatenate([batch, np.zeros((missing, *batch.shape[1:]), dtype=batch.dtype)])
+    
+    def _predict_onnx(self, model_info: Dict, batch: Union[np.ndarray, torch.Tensor]) -> List[np.ndarray]:
         """Run ONNX model inference"""
         session = model_info['session']
         
-        # Prepare input
-        if len(image_data.shape) == 3:
-            image_data = np.expand_dims(image_data, axis=0)
+        if isinstance(batch, torch.Tensor):
+            if batch.is_cuda and model_info['on_cuda']:
+                return self._predict_onnx_device(model_info, batch)
+            # Sessions that fell back to the CPU provider take host arrays
+            batch = batch.cpu().numpy()
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        
+        # On CUDA, copy into a preallocated device buffer and keep outputs bound on the device
+        if model_info['on_cuda']:
+            binding, input_value = self._get_onnx_binding(model_info, batch.shape)
+            input_value.update_inplace(batch)
+            session.run_with_iobinding(binding)
+            return binding.copy_outputs_to_cpu()
         
         # Run inference
-        input_dict = {model_info['input_name']: image_data.astype(np.float32)}
-        outputs = session.run(model_info['output_names'], input_dict)
+        return session.run(model_info['output_names'], {model_info['input_name']: batch})
+    
+    def _onnx_providers(self) -> List:
+        """Execution providers for ONNX Runtime sessions"""
+        if self.ort_stream is None:
+            return ['CPUExecutionProvider']
         
-        # Process outputs based on model type
+        cuda_options = {
+            'device_id': self.device.index or 0,
+            'arena_extend_strategy': 'kSameAsRequested',
+            'cudnn_conv_algo_search': 'HEURISTIC',
+            'do_copy_in_default_stream': True,
+            'user_compute_stream': str(self.ort_stream.cuda_stream)
+        }
+        return [('CUDAExecutionProvider', cuda_options), 'CPUExecutionProvider']
+    
+    def _get_onnx_binding(self, model_info: Dict, shape: tuple) -> tuple:
+        """Return the IOBinding and device input buffer for an input shape, creating them on first use"""
+        if shape not in model_info['bindings']:
+            session = model_info['session']
+            device_id = self.device.index or 0
+            binding = session.io_binding()
+            
+            input_value = ort.OrtValue.ortvalue_from_shape_and_type(list(shape), np.float32, 'cuda', device_id)
+            binding.bind_ortvalue_input(model_info['input_name'], input_value)
+            
+            for output in session.get_outputs():
+                output_shape = [shape[0], *output.shape[1:]]
+                if output.type == 'tensor(float)' and all(isinstance(dim, int) for dim in output_shape):
+                    output_value = ort.OrtValue.ortvalue_from_shape_and_type(output_shape, np.float32, 'cuda', device_id)
+                    binding.bind_ortvalue_output(output.name, output_value)
+                else:
+                    # Dynamic output shapes are allocated by ORT on the device
+                    binding.bind_output(output.name, 'cuda', device_id)
+            
+            model_info['bindings'][shape] = (binding, input_value)
+        return model_info['bindings'][shape]
+    
+    def _predict_onnx_device(self, model_info: Dict, batch: torch.Tensor) -> List[np.ndarray]:
+        """Run ONNX model inference on an input already in device memory"""
+        batch = batch.float().contiguous()
+        binding = model_info['session'].io_binding()
+        binding.bind_input(
+            name=model_info['input_name'],
+            device_type='cuda',
+            device_id=batch.device.index or 0,
+            element_type=np.float32,
+            shape=tuple(batch.shape),
+            buffer_ptr=batch.data_ptr()
+        )
+        for name in model_info['output_names']:
+            binding.bind_output(name)
+        
+        # ORT computes on the shared stream; order it after the preprocessing kernels
+        self.ort_stream.wait_stream(torch.cuda.current_stream())
+        model_info['session'].run_with_iobinding(binding)
+        return binding.copy_outputs_to_cpu()
+    
+    def _predict_tensorrt(self, model_info: Dict, batch: Union[np.ndarray, torch.Tensor]) -> List[np.ndarray]:
+        """Run TensorRT engine inference"""
+        device_input, host_input = model_info['input']
+        n = batch.shape[0]
+        if tuple(batch.shape[1:]) != tuple(host_input.shape[1:]) or n > host_input.shape[0]:
+            raise ValueError(f"Engine expects input shape {tuple(host_input.shape)}, got {batch.shape}")
+        
+        # Dynamic engines run exactly n samples; static ones run padded
+        context = model_info['context']
+        if model_info['dynamic']:
+            context.set_input_shape(model_info['input_name'], (n, *INPUT_SHAPE))
+        
+        stream = model_info['stream']
+        if isinstance(batch, torch.Tensor):
+            # Already on the device; order the copy after the preprocessing kernels
+            stream.wait_stream(torch.cuda.current_stream())
+            source = batch
+        else:
+            host_input[:n].copy_(torch.from_numpy(batch))
+            source = host_input[:n]
+        
+        with torch.cuda.stream(stream):
+            device_input[:n].copy_(source, non_blocking=True)
+            context.execute_async_v3(stream.cuda_stream)
+            for device_output, host_output in model_info['outputs']:
+                host_output[:n].copy_(device_output[:n], non_blocking=True)
+        stream.synchronize()
+        
+        return [host_output[:n].numpy() for _, host_output in model_info['outputs']]
+    
+    def _process_model_output(self, model_info: Dict, outputs: List[np.ndarray], **kwargs) -> Dict[str, Any]:
+        """Process one sample's outputs based on model type"""
         if 'detector' in model_info.get('name', ''):
             return self._process_detection_output(outputs, **kwargs)
         else:
             return self._process_classification_output(outputs, **kwargs)
     
-    async def _predict_pytorch(self, model_info: Dict, image_data: np.ndarray, **kwargs) -> Dict[str, Any]:
+    def _create_session(self, path: str) -> ort.InferenceSession:
+        """Create an ONNX Runtime session with the shared options and providers"""
+        return ort.InferenceSession(path, sess_options=self.ort_options, providers=self._onnx_providers())
+    
+    def _get_fp16_onnx(self, path: str) -> str:
+        """Return an FP16 copy of an ONNX model, converting it on first use"""
+        fp16_path = self._derived_path(path, '.fp16.onnx')
+        if fp16_path.exists():
+            return str(fp16_path)
+        if not FP16_CONVERTER_AVAILABLE:
+            logger.warning("onnxconverter-common not installed, serving FP32 ONNX models")
+            return path
+        
+        import onnx
+        # Inputs and outputs stay FP32 so callers are unaffected
+        model = float16.convert_float_to_float16(onnx.load(path), keep_io_types=True)
+        tmp_path = fp16_path.with_suffix(f'.{os.getpid()}.tmp')
+        onnx.save(model, str(tmp_path))
+        os.replace(tmp_path, fp16_path)
+        logger.info(f"Converted {path} to FP16")
+        return str(fp16_path)
+    
+    def _get_int8_onnx(self, name: str, path: str) -> str:
+        """Return an INT8 copy of an ONNX model for CPU serving, quantizing it on first use"""
+        int8_path = self._derived_path(path, '.int8.onnx')
+        if int8_path.exists():
+            return str(int8_path)
+        
+        tmp_path = int8_path.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+            if 'detector' in name:
+                # Activation ranges of conv-heavy detectors need calibration images
+                calibration_dir = self.config.get('int8_calibration_dir')
+                if not calibration_dir:
+                    logger.info(f"No int8_calibration_dir configured, serving {name} in FP32")
+                    return path
+                quantize_static(path, str(tmp_path), self._calibration_reader(path, calibration_dir),
+                                quant_format=QuantFormat.QDQ, weight_type=QuantType.QInt8,
+                                activation_type=QuantType.QUInt8)
+            else:
+                # Dynamic quantization of Conv emits ConvInteger, which the CPU provider
+                # runs slower than FP32 (or not at all), so only the dense layers are quantized
+                quantize_dynamic(path, str(tmp_path), weight_type=QuantType.QInt8,
+                                 op_types_to_quantize=['MatMul', 'Gemm'])
+            os.replace(tmp_path, int8_path)
+        except Exception as e:
+            logger.warning(f"INT8 quantization failed for {name}, serving FP32: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return path
+        
+        logger.info(f"Quantized {path} to INT8")
+        return str(int8_path)
+    
+    def _calibration_reader(self, path: str, calibration_dir: str):
+        """Feed preprocessed calibration images to static quantization"""
+        import onnx
+        from onnxruntime.quantization import CalibrationDataReader
+        
+        input_name = onnx.load(path).graph.input[0].name
+        limit = self.config.get('int8_calibration_size', 100)
+        files = sorted(p for p in Path(calibration_dir).iterdir()
+                       if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))[:limit]
+        preprocess = self._preprocess_cpu
+        
+        class _Reader(CalibrationDataReader):
+            def __init__(self):
+                self.files = iter(files)
+            
+            def get_next(self):
+                file = next(self.files, None)
+                if file is None:
+                    return None
+                return {input_name: preprocess(file.read_bytes()).numpy()[None]}
+        
+        return _Reader()
+    
+    def _derived_path(self, path: str, suffix: str, *salt) -> Path:
+        """
+        Path for a file generated from a model, named after a hash of the model's
+        contents so that deploying new weights to the same path rebuilds it.
+        """
+        digest = xxhash.xxh3_64()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        for value in salt:
+            digest.update(str(value).encode())
+        return Path(path).with_suffix(f'.{digest.hexdigest()[:12]}{suffix}')
+    
+    def _build_tensorrt_engine(self, onnx_path: str, engine_path: Path):
+        """Build an FP16 TensorRT engine from an ONNX model and save it"""
+        logger.info(f"Building TensorRT engine {engine_path}")
+        builder = trt.Builder(self._trt_logger)
+        network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+        parser = trt.OnnxParser(network, self._trt_logger)
+        with open(onnx_path, 'rb') as f:
+            if not parser.parse(f.read()):
+                raise RuntimeError(f"ONNX parse failed: {parser.get_error(0)}")
+        
+        config = builder.create_builder_config()
+        if self.precision == 'fp16' and builder.platform_has_fast_fp16:
+            config.set_flag(trt.BuilderFlag.FP16)
+        
+        # Dynamic batch sizes up to max_batch_size at the served input shape
+        profile = builder.create_optimization_profile()
+        for i in range(network.num_inputs):
+            tensor = network.get_input(i)
+            if -1 in tuple(tensor.shape):
+                largest = (self.max_batch_size, *INPUT_SHAPE)
+                profile.set_shape(tensor.name, (1, *INPUT_SHAPE), largest, largest)
+        config.add_optimization_profile(profile)
+        
+        # Reuse tactic timings across rebuilds of this model so kernels are not re-autotuned
+        cache_path = Path(onnx_path).with_suffix('.timing.cache')
+        cache = config.create_timing_cache(cache_path.read_bytes() if cache_path.exists() else b'')
+        config.set_timing_cache(cache, ignore_mismatch=False)
+        
+        serialized = builder.build_serialized_network(network, config)
+        if serialized is None:
+            raise RuntimeError("TensorRT engine build failed")
+        engine_path.write_bytes(serialized)
+        cache_path.write_bytes(config.get_timing_cache().serialize())
+    
+    def _load_tensorrt_engine(self, onnx_path: str) -> Dict[str, Any]:
+        """Load (building if needed) the TensorRT engine next to an ONNX model"""
+        # Engines also depend on the batch profile and precision they were built with
+        engine_path = self._derived_path(onnx_path, '.trt', self.max_batch_size, self.precision)
+        if not engine_path.exists():
+            self._build_tensorrt_engine(onnx_path, engine_path)
+        
+        runtime = trt.Runtime(self._trt_logger)
+        engine = runtime.deserialize_cuda_engine(engine_path.read_bytes())
+        if engine is None:
+            raise RuntimeError(f"Could not deserialize {engine_path}")
+        context = engine.create_execution_context()
+        
+        # Device buffers are bound once; pinned host buffers stage the copies
+        model_info = {'type': 'tensorrt', 'engine': engine, 'context': context,
+                      'stream': torch.cuda.Stream(), 'outputs': [], 'dynamic': False}
+        for i in range(engine.num_io_tensors):
+            tensor_name = engine.get_tensor_name(i)
+            dtype = torch.from_numpy(np.empty(0, dtype=trt.nptype(engine.get_tensor_dtype(tensor_name)))).dtype
+            is_input = engine.get_tensor_mode(tensor_name) == trt.TensorIOMode.INPUT
+            if is_input and -1 in tuple(engine.get_tensor_shape(tensor_name)):
+                # Buffers are sized for the largest batch
+                context.set_input_shape(tensor_name, (self.max_batch_size, *INPUT_SHAPE))
+                model_info['dynamic'] = True
+            shape = tuple(context.get_tensor_shape(tensor_name))
+            
+            device_buffer = torch.empty(shape, dtype=dtype, device=self.device)
+            host_buffer = torch.empty(shape, dtype=dtype, pin_memory=True)
+            context.set_tensor_address(tensor_name, device_buffer.data_ptr())
+            if is_input:
+                model_info['input'] = (device_buffer, host_buffer)
+                model_info['input_name'] = tensor_name
+                model_info['max_batch'] = shape[0]
+            else:
+                model_info['outputs'].append((device_buffer, host_buffer))
+        
+        logger.info(f"Loaded TensorRT engine {engine_path}")
+        return model_info
+    
+    def _optimize_pytorch_model(self, model: nn.Module) -> nn.Module:
+        """Trace a model at the served input shape, freeze it, fold Conv+BN and warm it up"""
+        example = torch.randn(1, *INPUT_SHAPE, device=self.device, dtype=self.dtype)
+        try:
+            try:
+                # Tracing records the graph for the fixed input shape only
+                compiled = torch.jit.trace(model, example)
+            except Exception as e:
+                logger.warning(f"TorchScript tracing failed, scripting instead: {e}")
+                compiled = torch.jit.script(model)
+            frozen = torch.jit.freeze(compiled.eval())
+            optimized = torch.jit.optimize_for_inference(frozen)
+        except Exception as e:
+            logger.warning(f"TorchScript optimization failed, serving the eager model: {e}")
+            optimized = model
+        
+        # The first calls profile and specialize the graph
+        with torch.no_grad():
+            for _ in range(WARMUP_COUNT):
+                optimized(example)
+        return optimized
+    
+    def _capture_cuda_graph(self, model: nn.Module, batch_size: int,
+                            pool: Optional[tuple] = None) -> Optional[Dict[str, Any]]:
+        """Capture one forward pass as a CUDA graph with static input/output buffers"""
+        static_input = torch.zeros(batch_size, *INPUT_SHAPE, device=self.device, dtype=self.dtype)
+        try:
+            # Warm up on a side stream so one-time allocations stay out of the graph
+            stream = torch.cuda.Stream()
+            stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(stream), torch.no_grad():
+                for _ in range(3):
+                    model(static_input)
+            torch.cuda.current_stream().wait_stream(stream)
+            
+            graph = torch.cuda.CUDAGraph()
+            # Graphs of one model never replay concurrently, so they share memory
+            # Other models may be loading on other threads during capture
+            with torch.cuda.graph(graph, pool=pool, capture_error_mode='thread_local'), torch.no_grad():
+                static_output = model(static_input)
+        except Exception as e:
+            logger.warning(f"CUDA graph capture failed, running eagerly: {e}")
+            return None
+        
+        return {'graph': graph, 'input': static_input, 'output': static_output}
+    
+    def _predict_pytorch(self, model_info: Dict, batch: Union[np.ndarray, torch.Tensor]) -> torch.Tensor:
         """Run PyTorch model inference"""
         model = model_info['model']
         
         # Convert to tensor
-        if isinstance(image_data, np.ndarray):
-            image_tensor = torch.from_numpy(image_data).float()
+        if isinstance(batch, np.ndarray):
+            image_tensor = torch.from_numpy(batch)
         else:
-            image_tensor = image_data
-        
-        if len(image_tensor.shape) == 3:
-            image_tensor = image_tensor.unsqueeze(0)
+            image_tensor = batch
+        n = image_tensor.shape[0]
         
-        # Move to device
-        image_tensor = image_tensor.to(self.device)
+        pinned = model_info.get('pinned_input')
+        if (pinned is not None and not image_tensor.is_cuda and n <= pinned.shape[0]
+                and tuple(image_tensor.shape[1:]) == tuple(pinned.shape[1:])):
+            # The copy completes before the next batch reuses the buffer, since
+            # post-processing synchronizes on the outputs
+            pinned[:n].copy_(image_tensor)
+            image_tensor = pinned[:n].to(self.device, non_blocking=True)
         
-        # Run inference
-        with torch.no_grad():
-            outputs = model(image_tensor)
+        # Replay the smallest captured graph that fits, padding the batch
+        graph_size = next((size for size in sorted(model_info['graphs']) if size >= n), None)
+        if graph_size is not None and tuple(image_tensor.shape[1:]) == INPUT_SHAPE:
+            runner = model_info['graphs'][graph_size]
+            runner['input'][:n].copy_(image_tensor)
+            runner['graph'].replay()
+            outputs = runner['output'][:n]
+        else:
+            # Move to device
+            image_tensor = image_tensor.to(self.device, dtype=self.dtype)
+            
+            # Run inference
+            with torch.no_grad():
+                outputs = model(image_tensor)
         
-        # Process outputs
-        return self._process_pytorch_output(outputs, **kwargs)
+        # Outputs stay on the device for post-processing
+        return outputs
     
     def _process_detection_output(self, outputs: List[np.ndarray], confidence_threshold: float = 0.5, **kwargs) -> Dict[str, Any]:
-        """Process object detection output"""
-        # Assuming YOLO-style output format
+        """
+        Process object detection output.
+        
+        Detections are returned column-wise: row i of ``boxes`` (x1, y1, x2, y2),
+        ``confidences``, ``class_ids`` and ``class_names`` describe detection i.
+        Cache hits rebuild the same arrays. The stdlib json encoder cannot
+        handle them, so responses are encoded with serialize_result().
+        """
+        # Assuming YOLO-style output format: x1, y1, x2, y2, conf, class_id
         predictions = outputs[0]
+        kept = predictions[predictions[:, 4] > confidence_threshold]
+        class_ids = kept[:, 5].astype(np.int32)
         
-        detections = []
-        for pred in predictions:
-            if pred[4] > confidence_threshold:  # Confidence score
-                x1, y1, x2, y2, conf, class_id = pred[:6]
-                detections.append({
-                    'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                    'confidence': float(conf),
-                    'class_id': int(class_id),
-                    'class_name': self._get_class_name('engine_detector', int(class_id))
-                })
+        classes = self.model_metadata.get('engine_detector', {}).get('classes', ())
+        class_names = [
+            classes[class_id] if 0 <= class_id < len(classes) else f"class_{class_id}"
+            for class_id in class_ids.tolist()
+        ]
         
         return {
-            'detections': detections,
-            'count': len(detections),
+            'boxes': kept[:, :4].astype(np.float32),
+            'confidences': kept[:, 4].astype(np.float32),
+            'class_ids': class_ids,
+            'class_names': class_names,
+            'count': len(class_names),
             'timestamp': datetime.now().isoformat()
         }
     
     def _process_classification_output(self, outputs: List[np.ndarray], top_k: int = 5, **kwargs) -> Dict[str, Any]:
         """Process classification output"""
-        scores = outputs[0].squeeze()
-        
-        # Get top-k predictions
-        if len(scores.shape) == 0:
-            scores = np.array([scores])
+        scores = np.atleast_1d(outputs[0].squeeze())
         
-        top_indices = np.argsort(scores)[-top_k:][::-1]
+        # Get top-k predictions, sorting only the selected k
+        k = min(top_k, scores.size)
+        top_indices = np.argpartition(scores, -k)[-k:] if k > 0 else np.empty(0, dtype=np.intp)
+        top_indices = top_indices[np.argsort(-scores[top_indices])]
         
-        predictions = []
-        for idx in top_indices:
-            predictions.append({
-                'class_id': int(idx),
-                'class_name': self._get_class_name('part_classifier', int(idx)),
-                'confidence': float(scores[idx])
-            })
+        return self._format_classification(scores[top_indices].tolist(), top_indices.tolist())
+    
+    def _topk_classifications(self, scores: torch.Tensor, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Select each request's top-k classes on the device, copying only those to the host"""
+        scores = scores.reshape(scores.shape[0], -1)
+        top_ks = [min(kwargs.get('top_k', 5), scores.shape[1]) for kwargs in requests]
+        values, indices = torch.topk(scores.float(), max(top_ks), dim=1)
+        values, indices = values.tolist(), indices.tolist()
+        return [self._format_classification(values[i][:k], indices[i][:k]) for i, k in enumerate(top_ks)]
+    
+    def _format_classification(self, confidences: List[float], class_ids: List[int]) -> Dict[str, Any]:
+        """Build the classification response from ranked class ids and scores"""
+        predictions = [
+            {
+                'class_id': class_id,
+                'class_name': self._get_class_name('part_classifier', class_id),
+                'confidence': confidence
+            }
+            for confidence, class_id in zip(confidences, class_ids)
+        ]
         
         return {
             'predictions': predictions,
@@ -266,14 +903,6 @@ class ModelServer:
             'timestamp': datetime.now().isoformat()
         }
     
-    def _process_pytorch_output(self, outputs: torch.Tensor, **kwargs) -> Dict[str, Any]:
-        """Process PyTorch model output"""
-        # Convert to numpy
-        outputs = outputs.cpu().numpy()
-        
-        # Use same processing as ONNX
-        return self._process_classification_output([outputs], **kwargs)
-    
     def _get_class_name(self, model_name: str, class_id: int) -> str:
         """Get class name from class ID"""
         classes = self.model_metadata.get(model_name, {}).get('classes', [])
@@ -281,30 +910,46 @@ class ModelServer:
             return classes[class_id]
         return f"class_{class_id}"
     
-    def _generate_cache_key(self, model_name: str, image_data: np.ndarray) -> str:
+    def _generate_cache_key(self, model_name: str, image_data: Union[np.ndarray, bytes]) -> str:
         """Generate cache key for inference result"""
-        # Use image hash for cache key
-        image_hash = hash(image_data.tobytes())
+        # Hash the raw buffer in place instead of copying it out with tobytes()
+        if not isinstance(image_data, bytes):
+            image_data = memoryview(np.ascontiguousarray(image_data)).cast('B')
+        image_hash = xxhash.xxh3_128_hexdigest(image_data)
         return f"inference:{model_name}:{image_hash}"
     
     async def _get_cached_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """Get cached inference result"""
+        # Entries are serialized bytes, so every hit gets its own copy
+        cached = self.inference_cache.get(cache_key)
+        if cached is not None:
+            return self._load_cached(cached)
+        
         try:
             cached = await self.redis_client.get(cache_key)
             if cached:
-                return json.loads(cached)
+                self.inference_cache[cache_key] = cached
+                return self._load_cached(cached)
         except Exception as e:
             logger.warning(f"Cache retrieval error: {e}")
         return None
     
+    def _load_cached(self, cached: bytes) -> Dict[str, Any]:
+        """Decode a cached result, restoring the detection arrays of a fresh one"""
+        result = orjson.loads(cached)
+        if 'boxes' in result:
+            result['boxes'] = np.asarray(result['boxes'], dtype=np.float32).reshape(-1, 4)
+            result['confidences'] = np.asarray(result['confidences'], dtype=np.float32)
+            result['class_ids'] = np.asarray(result['class_ids'], dtype=np.int32)
+        return result
+    
     async def _cache_result(self, cache_key: str, result: Dict[str, Any]):
         """Cache inference result"""
+        # Serialized once for both tiers; callers mutating result cannot corrupt later hits
+        cached = serialize_result(result)
+        self.inference_cache[cache_key] = cached
         try:
-            await self.redis_client.setex(
-                cache_key,
-                self.cache_ttl,
-                json.dumps(result)
-            )
+            await self.redis_client.setex(cache_key, self.cache_ttl, cached)
         except Exception as e:
             logger.warning(f"Cache storage error: {e}")
     
@@ -314,44 +959,92 @@ class ModelServer:
         async with aiofiles.open(file_path, 'rb') as f:
             image_data = await f.read()
         
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(image_data))
+        # The encoded file identifies the image, so the tensor never leaves the device
+        cache_key = self._generate_cache_key(model_name, image_data)
+        image_tensor = self._preprocess(image_data)
         
-        # Preprocess
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        # Run inference
+        return await self.predict(model_name, image_tensor, cache_key=cache_key, **kwargs)
+    
+    def _preprocess(self, image_data: bytes) -> torch.Tensor:
+        """Decode, resize and normalize an encoded image on the serving device"""
+        if self.device.type == 'cpu':
+            return self._preprocess_cpu(image_data)
         
-        # Transform to tensor
-        image_tensor = self.image_transform(image)
+        data = torch.frombuffer(image_data, dtype=torch.uint8)
+        if image_data[:2] == b'\xff\xd8':
+            # JPEG decodes on the GPU with nvJPEG
+            image = decode_jpeg(data, mode=ImageReadMode.RGB, device=self.device)
+        else:
+            image = decode_image(data, mode=ImageReadMode.RGB).to(self.device)
         
-        # Run inference
-        return await self.predict(model_name, image_tensor.numpy(), **kwargs)
+        image = F.interpolate(image.unsqueeze(0).float().div_(255), size=INPUT_SHAPE[1:],
+                              mode='bilinear', align_corners=False, antialias=True)
+        return image.sub_(self.mean).div_(self.std)[0]
     
-    async def batch_predict(self, model_name: str, images: List[np.ndarray], **kwargs) -> List[Dict[str, Any]]:
-        """Run batch inference"""
-        # Stack images into batch
-        batch = np.stack(images)
+    def _preprocess_cpu(self, image_data: bytes) -> torch.Tensor:
+        """Decode and resize in uint8, then normalize in a single fused pass"""
+        if self.jpeg is not None and image_data[:2] == b'\xff\xd8':
+            image = self._decode_turbojpeg(image_data)
+        else:
+            image = decode_image(torch.frombuffer(image_data, dtype=torch.uint8), mode=ImageReadMode.RGB)
+        image = F.interpolate(image.unsqueeze(0), size=INPUT_SHAPE[1:],
+                              mode='bilinear', align_corners=False, antialias=True)[0]
         
-        # Run inference
-        result = await self.predict(model_name, batch, **kwargs)
+        src = image.numpy()
+        out = np.empty(src.shape, dtype=np.float32)
+        _normalize_chw(out, src, self.norm_scale, self.norm_shift)
+        return torch.from_numpy(out)
+    
+    def _decode_turbojpeg(self, image_data: bytes) -> torch.Tensor:
+        """Decode a JPEG to a uint8 CHW tensor, scaled down no further than the model input"""
+        width, height, _, _ = self.jpeg.decode_header(image_data)
+        target_height, target_width = INPUT_SHAPE[1:]
         
-        # Split results
-        # This would need to be implemented based on specific model output format
-        return [result]  # Placeholder
+        # Smallest IDCT downscale that keeps both sides at least the model input size
+        fits = [
+            (num, denom) for num, denom in self.jpeg.scaling_factors
+            if num <= denom
+            and math.ceil(width * num / denom) >= target_width
+            and math.ceil(height * num / denom) >= target_height
+        ]
+        scaling_factor = min(fits, key=lambda factor: factor[0] / factor[1]) if fits else None
+        
+        rgb = self.jpeg.decode(image_data, pixel_format=TJPF_RGB, scaling_factor=scaling_factor)
+        return torch.from_numpy(rgb).permute(2, 0, 1)
+    
+    async def batch_predict(self, model_name: str, images: List[np.ndarray], **kwargs) -> List[Dict[str, Any]]:
+        """Run batch inference"""
+        # Each image is queued separately and the batching worker regroups them
+        return await asyncio.gather(*(self.predict(model_name, image, **kwargs) for image in images))
     
     async def warmup(self):
         """Warmup models with dummy inference"""
         logger.info("Warming up models...")
         
         # Create dummy image
-        dummy_image = np.random.randn(3, 640, 640).astype(np.float32)
+        dummy_image = np.random.randn(*INPUT_SHAPE).astype(np.float32)
         
-        for model_name in self.models:
+        for model_name, model_info in self.models.items():
+            # Run each batch size the batcher can produce, bypassing the cache
+            max_batch = model_info.get('max_batch', self.max_batch_size)
+            if model_info['type'] == 'pytorch':
+                batch_sizes = [size for size in GRAPH_BATCH_SIZES if size <= max_batch] or [max_batch]
+            else:
+                batch_sizes = sorted({self._padded_batch_size(model_info, n) for n in range(1, max_batch + 1)})
             try:
-                await self.predict(model_name, dummy_image)
-                logger.info(f"Model {model_name} warmed up")
+                for batch_size in batch_sizes:
+                    items = [(dummy_image, {}, None)] * batch_size
+                    for _ in range(WARMUP_COUNT):
+                        self._run_batch(model_name, items)
+                logger.info(f"Model {model_name} warmed up at batch sizes {batch_sizes}")
             except Exception as e:
                 logger.warning(f"Failed to warmup model {model_name}: {e}")
+        
+        # Release warmup-only allocations once all kernels have finished
+        if self.device.type == 'cuda':
+            torch.cuda.synchronize()
+            torch.cuda.empty_cache()
     
     async def get_model_info(self, model_name: Optional[str] = None) -> Dict[str, Any]:
         """Get information about loaded models"""
@@ -403,7 +1096,14 @@ class ModelServer:
         """Cleanup resources"""
         logger.info("Cleaning up model server resources...")
         
+        # Stop batching workers
+        for task in self._batch_workers.values():
+            task.cancel()
+        self._batch_workers.clear()
+        self._queues.clear()
+        
         # Clear models
+        self.inference_cache.clear()
         self.models.clear()
         self.model_metadata.clear()
         
@@ -416,8 +1116,6 @@ class ModelServer:
 
 # Example usage
 if __name__ == "__main__":
-    import io
-    
     config = {
         'redis_url': 'redis://localhost:6379/0',
         'cache_ttl': 3600,
@@ -0,0 +1,91 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock
+
+# Serving-only dependencies that the base requirements do not install
+for module in ('torch', 'torchvision', 'onnxruntime', 'aiofiles', 'prometheus_client'):
+    pytest.importorskip(module)
+
+# The deployment script is not a package module, load it from its path once
+# (it registers Prometheus metrics at import)
+_spec = importlib.util.spec_from_file_location(
+    'model_server', Path(__file__).resolve().parents[1] / 'deployment' / 'model-server.py'
+)
+model_server = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(model_server)
+
+
+@pytest.fixture
+def server():
+    server = model_server.ModelServer({'redis_url': 'redis://localhost:6379/0', 'models': {}})
+    server.model_metadata['engine_detector'] = {'classes': ('air_filter', 'alternator')}
+    server.redis_client = AsyncMock()
+    return server
+
+
+@pytest.fixture
+def predictions():
+    # x1, y1, x2, y2, confidence, class_id
+    return np.array([
+        [10, 20, 30, 40, 0.9, 1],
+        [0, 0, 1, 1, 0.1, 0],
+        [5, 5, 15, 15, 0.6, 7]
+    ], dtype=np.float32)
+
+
+class TestDetectionOutput:
+    def test_detections_are_returned_as_columns(self, server, predictions):
+        result = server._process_detection_output([predictions], confidence_threshold=0.5)
+
+        assert result['count'] == 2
+        assert result['boxes'].dtype == np.float32
+        np.testing.assert_array_equal(result['boxes'], [[10, 20, 30, 40], [5, 5, 15, 15]])
+        np.testing.assert_allclose(result['confidences'], [0.9, 0.6])
+        assert result['class_ids'].dtype == np.int32
+        np.testing.assert_array_equal(result['class_ids'], [1, 7])
+        assert result['class_names'] == ['alternator', 'class_7']
+
+    def test_no_detections(self, server, predictions):
+        result = server._process_detection_output([predictions], confidence_threshold=0.95)
+
+        assert result['count'] == 0
+        assert result['boxes'].shape == (0, 4)
+        assert result['class_names'] == []
+
+    def test_result_serializes(self, server, predictions):
+        result = server._process_detection_output([predictions], confidence_threshold=0.5)
+
+        encoded = model_server.orjson.loads(model_server.serialize_result(result))
+
+        assert encoded['boxes'] == [[10, 20, 30, 40], [5, 5, 15, 15]]
+        assert encoded['class_ids'] == [1, 7]
+
+
+class TestResultCache:
+    async def test_redis_hit_restores_arrays(self, server, predictions):
+        result = server._process_detection_output([predictions], confidence_threshold=0.5)
+        await server._cache_result('inference:engine_detector:key', result)
+        server.redis_client.get.return_value = server.redis_client.setex.call_args.args[2]
+        server.inference_cache.clear()
+
+        cached = await server._get_cached_result('inference:engine_detector:key')
+
+        assert cached['boxes'].dtype == np.float32
+        np.testing.assert_array_equal(cached['boxes'], result['boxes'])
+        assert cached['class_ids'].dtype == np.int32
+        np.testing.assert_array_equal(cached['class_ids'], result['class_ids'])
+        assert cached['class_names'] == result['class_names']
+
+    async def test_local_hits_are_independent_copies(self, server, predictions):
+        result = server._process_detection_output([predictions], confidence_threshold=0.5)
+        await server._cache_result('inference:engine_detector:key', result)
+
+        first = await server._get_cached_result('inference:engine_detector:key')
+        first['class_names'].append('mutated')
+        second = await server._get_cached_result('inference:engine_detector:key')
+
+        assert second['class_names'] == ['alternator', 'class_7']
+        server.redis_client.get.assert_not_called()
@@ -109,20 +109,28 @@ class TestScanProcessor:
 
     @pytest.mark.asyncio
     async def test_download_image_from_url(self, scan_processor):
+        chunks = [b'fake_', b'image_', b'data']
+
+        async def aiter_bytes():
+            for chunk in chunks:
+                yield chunk
+
         mock_response = Mock()
-        mock_response.content = b'fake_image_data'
-        
-        with patch('httpx.AsyncClient.get', return_value=mock_response):
-            with patch('PIL.Image.open') as mock_open:
-                mock_image = Mock()
-                mock_array = np.zeros((480, 640, 3), dtype=np.uint8)
-                mock_image.__array__ = Mock(return_value=mock_array)
-                mock_open.return_value = mock_image
+        mock_response.headers = {'content-length': str(sum(len(c) for c in chunks))}
+        mock_response.aiter_bytes = aiter_bytes
+
+        mock_stream = AsyncMock()
+        mock_stream.__aenter__.return_value = mock_response
+
+        with patch('httpx.AsyncClient.stream', return_value=mock_stream):
+            with patch('cv2.imdecode') as mock_imdecode:
+                mock_imdecode.return_value = np.zeros((480, 640, 3), dtype=np.uint8)
 
                 result = await scan_processor._download_image("https://example.com/image.jpg")
                 
                 assert isinstance(result, np.ndarray)
                 assert result.shape == (480, 640, 3)
+                assert bytes(mock_imdecode.call_args[0][0]) == b'fake_image_data'
 
     @pytest.mark.asyncio
     async def test_download_image_from_base64(self, scan_processor):